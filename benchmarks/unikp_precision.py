@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""
+Speed, memory and accuracy of the ProtT5 inference precisions.
+
+Encodes a fixed set of sequences (the first N records of a FASTA file) at
+every precision, each in a fresh process so peak RSS is per mode, and
+compares the embeddings and the log10 kcat predictions of the UniKP
+regressor with the fp32 baseline. Sequences are paired with a fixed list of
+SMILES. Needs the encoders and models in $UNIKP.
+
+    python benchmarks/unikp_precision.py --num-sequences 64
+"""
+
+import argparse
+import multiprocessing
+import os
+import pickle
+import resource
+import sys
+import time
+
+import numpy as np
+from Bio.SeqIO.FastaIO import SimpleFastaParser
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+if os.environ.get("UNIKP"):
+    sys.path.append(os.environ["UNIKP"])
+
+DEFAULT_FASTA = os.path.join(
+    os.path.dirname(__file__), "..", "test", "PAO1", "protein.faa"
+)
+# Common substrates paired with the sequences in turn
+SMILES = [
+    "C(C1C(C(C(C(O1)O)O)O)O)O",
+    "CC(=O)C(=O)O",
+    "C(C(=O)O)C(CC(=O)O)(C(=O)O)O",
+    "C(CC(=O)O)C(C(=O)O)N",
+    "C1=NC(=C2C(=N1)N(C=N2)C3C(C(C(O3)COP(=O)(O)OP(=O)(O)OP(=O)(O)O)O)O)N",
+    "C(C(C(=O)O)N)C(=O)N",
+    "CC(C(=O)O)N",
+    "C(C(=O)COP(=O)(O)O)O",
+]
+
+
+def read_sequences(fasta, num_sequences):
+    sequences = []
+    with open(fasta) as handle:
+        for _, seq in SimpleFastaParser(handle):
+            sequences.append(seq)
+            if len(sequences) == num_sequences:
+                break
+    return sequences
+
+
+def encode(model_path, sequences, precision, token_budget):
+    """Load and run ProtT5 at one precision; run in its own process."""
+    from emmai.encoders import Seq_to_vec, load_prot_t5
+
+    start = time.perf_counter()
+    encoder = load_prot_t5(model_path, precision)
+    load_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    vectors = Seq_to_vec(sequences, model_path, token_budget, encoder=encoder)
+    encode_seconds = time.perf_counter() - start
+    # ru_maxrss is in KiB on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return vectors, load_seconds, encode_seconds, peak_rss
+
+
+def cosine(a, b):
+    return np.sum(a * b, axis=1) / (
+        np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fasta", default=DEFAULT_FASTA)
+    parser.add_argument("--num-sequences", type=int, default=64)
+    parser.add_argument(
+        "--precisions",
+        nargs="+",
+        default=["fp32", "bf16", "int8"],
+        help="precisions to compare; fp32 is always run as the baseline",
+    )
+    parser.add_argument("--token-budget", type=int, default=None)
+    args = parser.parse_args()
+
+    model_path = os.environ.get("UNIKP")
+    if model_path is None:
+        raise ValueError("The UNIKP environment variable is not set.")
+    precisions = ["fp32"] + [p for p in args.precisions if p != "fp32"]
+    sequences = read_sequences(args.fasta, args.num_sequences)
+    print(f"{len(sequences)} sequences from {args.fasta}")
+
+    results = {}
+    ctx = multiprocessing.get_context("spawn")
+    for precision in precisions:
+        with ctx.Pool(1) as pool:
+            results[precision] = pool.apply(
+                encode, (model_path, sequences, precision, args.token_budget)
+            )
+
+    from emmai.encoders import smiles_to_vec
+
+    with open(os.path.join(model_path, "UniKP for kcat.pkl"), "rb") as f:
+        model = pickle.load(f)
+    smiles = [SMILES[i % len(SMILES)] for i in range(len(sequences))]
+    smiles_vecs = smiles_to_vec(smiles, model_path)
+    log10_kcats = {
+        precision: model.predict(np.concatenate((smiles_vecs, vectors), axis=1))
+        for precision, (vectors, *_) in results.items()
+    }
+
+    baseline, _, baseline_seconds, _ = results["fp32"]
+    print(
+        f"{'mode':>6} {'load s':>8} {'encode s':>9} {'speedup':>8} {'peak MiB':>9} "
+        f"{'emb max|d|':>11} {'cos min':>8} {'kcat max|d|':>12} {'kcat mean|d|':>13}"
+    )
+    for precision, (vectors, load_seconds, encode_seconds, peak_rss) in results.items():
+        similarity = cosine(baseline, vectors)
+        drift = np.abs(log10_kcats[precision] - log10_kcats["fp32"])
+        print(
+            f"{precision:>6} {load_seconds:8.1f} {encode_seconds:9.1f} "
+            f"{baseline_seconds / encode_seconds:7.2f}x {peak_rss:9.0f} "
+            f"{np.abs(vectors - baseline).max():11.4f} {similarity.min():8.5f} "
+            f"{drift.max():12.4f} {drift.mean():13.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+"""
+Per-reaction and bulk application of the enzyme-usage coefficients.
+
+Splits a genome-scale model as stage 3 does (iJO1366, bundled with cobra,
+by default), pairs its substrate edges with synthetic kcats and gene masses,
+then adds the stage 3 and stage 4 usage coefficients to a copy of the model
+twice: with one ``reaction.add_metabolites`` call per reaction, and with
+:func:`emmai.gems.add_metabolite_coefficients`. Both models are written to
+SBML and must be byte-identical, once the members of each group are sorted:
+cobra keeps them in a set, so their order changes from run to run.
+
+    python benchmarks/usage_coefficients.py
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from emmai.gems import add_metabolite_coefficients, read_model  # noqa: E402
+from emmai.pairing import substrate_edges  # noqa: E402
+from emmai.stages.model_modification import (  # noqa: E402
+    split_isozymes,
+    split_reversible_reactions,
+    usage_coefficients,
+)
+from emmai.stages.patching import (  # noqa: E402
+    average_usage_coefficient,
+    patch_coefficients,
+)
+
+TRANSPORTERS = ["transport", "symporter", "diffusion", "antiport"]
+COFACTORS = ["H2O", "H+"]
+
+
+def default_model():
+    import cobra
+
+    return os.path.join(os.path.dirname(cobra.__file__), "data", "iJO1366.xml.gz")
+
+
+def synthetic_kcats(model, seed):
+    """Stage 2 style kcat and gene mass tables, with 10% missing kcats."""
+    rng = np.random.default_rng(seed)
+    genes, edges = substrate_edges(model, COFACTORS)
+    edges["Kcat"] = 10 ** rng.normal(4, 1, len(edges))
+    edges.loc[rng.random(len(edges)) < 0.1, "Kcat"] = np.nan
+    masses = pd.DataFrame(
+        {"Mass": rng.uniform(2e4, 9e4, len(genes))},
+        index=pd.Index(genes["Gene ID"], name="Gene ID"),
+    )
+    return edges.set_index("Gene ID"), masses
+
+
+def per_reaction(metabolite, coefficients):
+    for reaction, coefficient in coefficients.items():
+        reaction.add_metabolites({metabolite: coefficient})
+
+
+def sorted_group_members(path):
+    """SBML text with each run of group member elements sorted."""
+    lines, members = [], []
+    with open(path) as handle:
+        for line in handle:
+            if "<groups:member " in line:
+                members.append(line)
+                continue
+            lines.extend(sorted(members))
+            members = []
+            lines.append(line)
+    return "".join(lines)
+
+
+def add_usage(model, stage3_coefficients, apply):
+    """Stage 3 and 4 usage coefficients, timed apart from computing them."""
+    import cobra
+
+    usage = cobra.Metabolite(
+        "usage", name="resource_usage_pseudometabolite", compartment="c"
+    )
+    model.add_metabolites([usage])
+    model.add_boundary(usage, type="demand").bounds = (-0.1, 0.0)
+
+    coefficients = {
+        model.reactions.get_by_id(reaction_id): coefficient
+        for reaction_id, coefficient in stage3_coefficients.items()
+    }
+    start = time.perf_counter()
+    apply(usage, coefficients)
+    stage3 = time.perf_counter() - start
+
+    coefficients = patch_coefficients(
+        model, average_usage_coefficient(model), TRANSPORTERS, []
+    )
+    start = time.perf_counter()
+    apply(usage, coefficients)
+    return len(usage.reactions), stage3, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--model", default=None, help="SBML model (default: cobra's iJO1366)"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    model = read_model(args.model or default_model())
+    updated_sns, gene_sequence_mass = synthetic_kcats(model, args.seed)
+    split_reversible_reactions(model, TRANSPORTERS)
+    split_isozymes(model, TRANSPORTERS)
+    print(
+        f"{len(model.reactions)} reactions, {len(model.metabolites)} metabolites "
+        f"after splitting; {len(updated_sns)} substrate edges"
+    )
+
+    import cobra
+
+    # Computed once: kcats are averaged in gene set order, which differs
+    # between copies of the model
+    ec_model = model.copy()
+    ec_model.add_metabolites([cobra.Metabolite("usage")])
+    stage3_coefficients = {
+        reaction.id: coefficient
+        for reaction, coefficient in usage_coefficients(
+            ec_model, updated_sns, gene_sequence_mass, TRANSPORTERS
+        ).items()
+    }
+
+    outputs = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, apply in [
+            ("per-reaction", per_reaction),
+            ("bulk", add_metabolite_coefficients),
+        ]:
+            ec_model = model.copy()
+            charged, stage3, stage4 = add_usage(ec_model, stage3_coefficients, apply)
+            objective = ec_model.slim_optimize()
+            path = os.path.join(directory, f"{name}.xml")
+            cobra.io.write_sbml_model(ec_model, path)
+            outputs[name] = sorted_group_members(path)
+            print(
+                f"{name:>12}: {charged} reactions charged, stage 3 {stage3:7.2f} s, "
+                f"stage 4 {stage4:7.2f} s, objective {objective:.6g}"
+            )
+
+    identical = outputs["per-reaction"] == outputs["bulk"]
+    print(f"SBML output identical: {identical}")
+    if not identical:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+"""
+EMMAi: enzyme-constrained genome-scale metabolic models from UniKP kcats.
+
+The pipeline stages live in :mod:`emmai.stages` and run with
+``emmai <stage>``. Submodules are imported on first use, so importing the
+package does not pull in cobra, pandas or torch.
+"""
+
+import importlib
+
+__version__ = "0.1.0"
+
+# Public names and the submodules defining them, imported when first used
+_LAZY = {"Config": "config", "load_config": "config", "run_stage": "cli"}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        return getattr(importlib.import_module(f".{_LAZY[name]}", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
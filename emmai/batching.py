@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+import queue
+import threading
+
+import numpy as np
+
+
+def plan_batches(lengths, token_budget):
+    """
+    Group sequences into length-sorted batches under a padded-token budget.
+
+    Sequences are sorted longest first and each batch grows while the number
+    of sequences times the longest length in the batch (its padded size) stays
+    within ``token_budget``. A sequence longer than the budget gets a batch of
+    its own.
+
+    Args:
+        lengths (Sequence[int]): Token count of each sequence
+        token_budget (int): Maximum padded tokens per batch
+
+    Returns:
+        list[numpy.ndarray]: Original positions of the sequences in each batch
+    """
+    return list(adaptive_batches(lengths, lambda width: token_budget // width))
+
+
+def adaptive_batches(lengths, max_batch_size):
+    """
+    Length-sorted batches whose size is decided as each batch is formed.
+
+    Like :func:`plan_batches`, but ``max_batch_size(width)`` is called for
+    every batch with the padded length of its first, longest sequence, so
+    the sizes can follow a budget that changes while the batches are used.
+
+    Yields:
+        numpy.ndarray: Original positions of the sequences in each batch
+    """
+    lengths = np.asarray(lengths)
+    order = np.argsort(-lengths, kind="stable")
+    start = 0
+    while start < len(order):
+        # The first sequence of a batch is its longest, so it sets the padding
+        width = max(int(lengths[order[start]]), 1)
+        size = max(int(max_batch_size(width)), 1)
+        yield order[start : start + size]
+        start += size
+
+
+class MemoryBudget:
+    """
+    Memory allowance for one batch that backs off on OOM and grows back.
+
+    The allowance starts at ``ceiling``. Every out-of-memory error halves
+    it. After ``patience`` batches in a row have fit, it grows by ``growth``,
+    up to ``ceiling`` and only if that much memory is currently free.
+
+    Args:
+        ceiling (int): Largest allowance in bytes
+        growth (float): Factor by which the allowance grows back
+        patience (int): Successful batches between two increases
+    """
+
+    def __init__(self, ceiling, growth=1.25, patience=4):
+        self.ceiling = int(ceiling)
+        self.allowed = self.ceiling
+        self.growth = growth
+        self.patience = patience
+        self._fits = 0
+
+    def shrink(self):
+        self.allowed = max(self.allowed // 2, 1)
+        self._fits = 0
+        print(f"Out of memory, batch memory allowance lowered to {self.allowed:,} B")
+
+    def fitted(self, free=None):
+        """Record a batch that fit, growing the allowance after ``patience``."""
+        self._fits += 1
+        if self.allowed >= self.ceiling or self._fits < self.patience:
+            return
+        grown = min(int(self.allowed * self.growth), self.ceiling)
+        if free is not None and grown - self.allowed > free:
+            return
+        self.allowed = grown
+        self._fits = 0
+
+
+def fixed_batches(num_sequences, batch_size):
+    """Input-order batches of a fixed count, as used before length bucketing."""
+    return [
+        np.arange(i, min(i + batch_size, num_sequences))
+        for i in range(0, num_sequences, batch_size)
+    ]
+
+
+def padding_overhead(lengths, batches):
+    """
+    Padded and real token counts of a batch plan.
+
+    Returns:
+        tuple: Total padded tokens (batch size times longest member, summed
+        over batches) and total real tokens
+    """
+    lengths = np.asarray(lengths)
+    padded = sum(len(batch) * int(lengths[batch].max()) for batch in batches)
+    return padded, int(lengths.sum())
+
+
+def prefetch(iterable, depth=2):
+    """
+    Iterate over ``iterable`` while a background thread produces its items.
+
+    Up to ``depth`` items are prepared ahead of the consumer, e.g. tokenized
+    batches while the encoder runs on the current one. An exception raised
+    by the producer is raised again in the consumer, and the producer stops
+    once the consumer stops iterating.
+    """
+    items = queue.Queue(maxsize=depth)
+    stopped = threading.Event()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(("item", item)):
+                    return
+        except BaseException as e:
+            put(("error", e))
+        else:
+            put(("done", None))
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            kind, value = items.get()
+            if kind == "error":
+                raise value
+            if kind == "done":
+                return
+            yield value
+    finally:
+        stopped.set()
+        producer.join()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+import json
+import os
+
+import pandas as pd
+
+
+def journal_path_for(file_to_update):
+    """Append-only journal that accompanies a checkpointed CSV file."""
+    return f"{file_to_update}.journal"
+
+
+def compacting_path_for(file_to_update):
+    """A journal set aside while :func:`compact_checkpoint` folds it in."""
+    return f"{file_to_update}.journal.compacting"
+
+
+def settings_path_for(file_to_update):
+    """Settings that a checkpointed CSV file and its journal were written with."""
+    return f"{file_to_update}.settings.json"
+
+
+def _json_default(value):
+    # NumPy scalars (e.g. int64 counts) are not JSON serialisable themselves
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def append_journal(journal_path, rows):
+    """
+    Durably append rows to a journal, one JSON object per line.
+
+    The batch is flushed and fsync'd before returning, so a job killed
+    afterwards keeps every row written so far. The cost of a call depends only
+    on the size of the batch, not on the size of the journal.
+    """
+    if not rows:
+        return
+    lines = "".join(json.dumps(row, default=_json_default) + "\n" for row in rows)
+    with open(journal_path, "a", encoding="utf-8") as f:
+        f.write(lines)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_journal(journal_path, repair=False):
+    """
+    Read the rows of a journal, ignoring a torn final line.
+
+    A job killed while appending can leave the last line incomplete. That line
+    is skipped and, with ``repair=True``, truncated away so later appends start
+    on a clean line.
+    """
+    rows = []
+    if not os.path.exists(journal_path):
+        return rows
+    valid_bytes = 0
+    with open(journal_path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                break
+            valid_bytes += len(line)
+    if repair and valid_bytes != os.path.getsize(journal_path):
+        print(f"Discarding incomplete entries at the end of {journal_path}")
+        with open(journal_path, "r+b") as f:
+            f.truncate(valid_bytes)
+            f.flush()
+            os.fsync(f.fileno())
+    return rows
+
+
+def finish_compaction(file_to_update):
+    """
+    Complete a :func:`compact_checkpoint` killed after it set the journal aside.
+
+    The new CSV was written in full before that, so it is renamed into place
+    if it has not been yet, and the set-aside journal is then deleted.
+    """
+    compacting_path = compacting_path_for(file_to_update)
+    if not os.path.exists(compacting_path):
+        return
+    tmp_path = f"{file_to_update}.tmp"
+    if os.path.exists(tmp_path):
+        os.replace(tmp_path, file_to_update)
+    os.remove(compacting_path)
+
+
+def read_checkpoint(file_to_update, df_columns, repair=False):
+    """Combine the compacted CSV checkpoint with any journal entries after it."""
+    finish_compaction(file_to_update)
+    frames = []
+    if os.path.exists(file_to_update):
+        # Round-trip parsing reads back exactly the floats that were written
+        frames.append(pd.read_csv(file_to_update, float_precision="round_trip"))
+    rows = read_journal(journal_path_for(file_to_update), repair=repair)
+    if rows:
+        frames.append(pd.DataFrame(rows))
+    if not frames:
+        return pd.DataFrame(columns=df_columns)
+    values_df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    return values_df
+
+
+def compact_checkpoint(file_to_update, df_columns):
+    """
+    Fold the journal into the CSV checkpoint and remove the journal.
+
+    The CSV is rewritten in full to a temporary file. Only then is the journal
+    renamed aside, the temporary file renamed over the CSV and the set-aside
+    journal deleted. A kill before the journal is set aside leaves the old CSV
+    and journal. A kill after it leaves the set-aside journal, from which
+    :func:`finish_compaction` completes the renames on the next read, so no
+    journal row is ever read both from the CSV and from a journal.
+    """
+    journal_path = journal_path_for(file_to_update)
+    if not os.path.exists(journal_path):
+        return
+    values_df = read_checkpoint(file_to_update, df_columns)
+    tmp_path = f"{file_to_update}.tmp"
+    with open(tmp_path, "w", newline="") as f:
+        values_df.to_csv(f, index=False)
+        f.flush()
+        os.fsync(f.fileno())
+    compacting_path = compacting_path_for(file_to_update)
+    os.replace(journal_path, compacting_path)
+    os.replace(tmp_path, file_to_update)
+    os.remove(compacting_path)
+
+
+def match_checkpoint_settings(file_to_update, settings):
+    """
+    Discard a checkpoint written with other settings, and record ``settings``.
+
+    Results computed with, e.g., another model or precision are not resumed.
+    A checkpoint without recorded settings predates them and is discarded too.
+
+    Args:
+        file_to_update (str): The checkpointed CSV file
+        settings (dict): JSON-serialisable settings the results depend on
+
+    Returns:
+        bool: Whether an existing checkpoint was discarded
+    """
+    # An interrupted compaction's rows are discarded with the rest
+    finish_compaction(file_to_update)
+    settings_path = settings_path_for(file_to_update)
+    recorded = None
+    if os.path.exists(settings_path):
+        with open(settings_path, encoding="utf-8") as f:
+            recorded = json.load(f)
+    if recorded == settings:
+        return False
+
+    existing = [
+        path
+        for path in (file_to_update, journal_path_for(file_to_update))
+        if os.path.exists(path)
+    ]
+    if existing:
+        print(
+            f"{file_to_update} was written with settings {recorded}, "
+            f"not {settings}; starting it over"
+        )
+        for path in existing:
+            os.remove(path)
+    tmp_path = f"{settings_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(settings, f, default=_json_default)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, settings_path)
+    return bool(existing)
@@ -0,0 +1,121 @@
+"""
+Command line interface of the EMMAi pipeline.
+
+    emmai data-retrieval [--inputs DIR]
+    emmai unikp [--inputs DIR] [--shard I/N | --workers N | --merge]
+    emmai model-modification | patching | calibration [--inputs DIR]
+    emmai build-model [--inputs DIR] [--intermediates none|sync|async]
+
+Each stage reads ``inputs.yml`` from ``--inputs`` or the INPUTS directory.
+The UniKP tools take their own arguments, e.g. ``emmai unikp-server --help``.
+Only the module of the chosen command is imported.
+"""
+
+import argparse
+import importlib
+import sys
+
+from .stages import RUNNERS, STAGES
+
+# Command-line tools and the modules whose main() runs them
+TOOLS = {
+    "unikp-server": ("unikp_server", "serve the UniKP models on a Unix socket"),
+    "tree-ensemble": ("tree_ensemble", "convert or verify the kcat regressor"),
+    "export-encoders": ("export_encoders", "export and verify encoder backends"),
+}
+
+STAGE_HELP = {
+    "data-retrieval": "1. retrieve gene sequences and metabolite SMILES",
+    "unikp": "2. predict kcats with UniKP",
+    "model-modification": "3. build the enzyme-constrained model",
+    "patching": "4. patch reactions without a kcat",
+    "calibration": "5. calibrate the protein pool",
+    "build-model": "3-5. build, patch and calibrate the model in one process",
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="emmai", description="Enzyme-constrained metabolic models with UniKP."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name in list(STAGES) + list(RUNNERS):
+        stage = subparsers.add_parser(name, help=STAGE_HELP[name])
+        stage.add_argument(
+            "--inputs",
+            help="directory holding inputs.yml (default: $INPUTS)",
+        )
+        if name == "unikp":
+            stage.add_argument(
+                "--shard",
+                help="only predict shard 'index/count' of the distinct sequences "
+                "and write its results for --merge (default: the SLURM array "
+                "task, if any)",
+            )
+            stage.add_argument(
+                "--workers",
+                type=int,
+                help="run this many shards in parallel local processes, then merge",
+            )
+            stage.add_argument(
+                "--merge",
+                action="store_true",
+                help="only combine the shard results into "
+                "sequences_smiles_complete.csv",
+            )
+        if name == "build-model":
+            stage.add_argument(
+                "--intermediates",
+                choices=["none", "sync", "async"],
+                help="write the stage 3 and 4 models too, before going on or "
+                "in the background (default: ec_model_intermediates in "
+                "inputs.yml, or none)",
+            )
+    for name, (_, description) in TOOLS.items():
+        tool = subparsers.add_parser(name, help=description, add_help=False)
+        tool.add_argument("args", nargs=argparse.REMAINDER)
+    return parser
+
+
+def run_stage(name, inputs_path=None, **options):
+    """
+    Run one pipeline stage in this process.
+
+    Args:
+        name (str): A key of :data:`emmai.stages.STAGES` or
+            :data:`emmai.stages.RUNNERS`, e.g. ``"unikp"``
+        inputs_path (str): Directory holding ``inputs.yml``, by default the
+            INPUTS directory
+        **options: Passed on to the stage's ``run``
+    """
+    from .config import load_config
+
+    modules = {**STAGES, **RUNNERS}
+    module = importlib.import_module(f".stages.{modules[name]}", __package__)
+    return module.run(load_config(inputs_path), **options)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    # Tools parse their own arguments, including --help
+    if argv and argv[0] in TOOLS:
+        module = importlib.import_module(f".{TOOLS[argv[0]][0]}", __package__)
+        return module.main(argv[1:], prog=f"emmai {argv[0]}")
+
+    args = build_parser().parse_args(argv)
+    options = {}
+    if args.command == "unikp":
+        from .sharding import parse_shard
+
+        options = {
+            "shard": parse_shard(args.shard) if args.shard else None,
+            "workers": args.workers,
+            "merge": args.merge,
+        }
+    elif args.command == "build-model":
+        options = {"intermediates": args.intermediates}
+    run_stage(args.command, args.inputs, **options)
+
+
+if __name__ == "__main__":
+    main()
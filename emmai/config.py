@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+import os
+
+import yaml
+
+
+class Config:
+    """
+    Settings of one pipeline run, read from ``inputs.yml``.
+
+    Paths in the file are relative to the inputs directory holding it.
+    Keys are read with ``config[key]`` when required and ``config.get(key,
+    default)`` otherwise, as from the parsed YAML mapping.
+
+    Args:
+        data (dict): Parsed contents of ``inputs.yml``
+        inputs_path (str): Directory holding ``inputs.yml``
+    """
+
+    def __init__(self, data, inputs_path):
+        self.data = data
+        self.inputs_path = inputs_path
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def path(self, key, default=None):
+        """``config[key]`` resolved against the inputs directory."""
+        value = self.data.get(key) or default
+        if value is None:
+            raise KeyError(key)
+        return os.path.join(self.inputs_path, value)
+
+    @property
+    def output_dir(self):
+        """The run's output directory, created if needed."""
+        path = self.path("output_file_path")
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    @property
+    def cache_dir(self):
+        """Cache of API responses and embeddings, shared across runs."""
+        return self.path("cache_dir", "cache")
+
+
+def load_config(inputs_path=None):
+    """
+    Read ``inputs.yml`` from ``inputs_path`` or the INPUTS directory.
+
+    Raises:
+        ValueError: If no directory is given and INPUTS is not set
+        FileNotFoundError: If the directory has no ``inputs.yml``
+    """
+    if not inputs_path:
+        inputs_path = os.getenv("INPUTS")  # From your env.sh file
+        if inputs_path is None:
+            raise ValueError("The INPUTS environment variable is not set.")
+
+    inputs_file = os.path.join(inputs_path, "inputs.yml")
+    if not os.path.isfile(inputs_file):
+        raise FileNotFoundError(
+            f"The 'inputs.yml' file could not be found at {inputs_file}."
+        )
+    with open(inputs_file, "r") as file:
+        data = yaml.safe_load(file)
+    return Config(data, inputs_path)
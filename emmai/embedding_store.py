@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+import fcntl
+import hashlib
+import os
+from contextlib import contextmanager
+
+import numpy as np
+
+
+def sequence_key(sequence, namespace="prot_t5_xl_uniref50"):
+    """Content address of an encoder input: a hash of the namespaced text."""
+    return hashlib.sha256(f"{namespace}\n{sequence}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    Persistent, content-addressed store of fixed-size embedding vectors.
+
+    Vectors live in one flat float32 file that is memory-mapped for reads,
+    with a text index holding one key per row in the same order. Several
+    processes may share a store: appends are serialised with an exclusive
+    ``flock`` and write the vectors before their keys, so the index never
+    refers to a row that is not fully on disk.
+
+    Args:
+        directory (str): Directory holding ``vectors.f32`` and ``keys.txt``
+        dim (int): Length of each vector
+    """
+
+    def __init__(self, directory, dim=1024):
+        os.makedirs(directory, exist_ok=True)
+        self.dim = dim
+        self.row_bytes = dim * np.dtype(np.float32).itemsize
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.keys_path = os.path.join(directory, "keys.txt")
+        self.lock_path = os.path.join(directory, ".lock")
+        self._index = {}
+        self._rows = 0
+        self._keys_offset = 0
+        self._refresh()
+
+    @contextmanager
+    def _locked(self):
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _refresh(self):
+        # Pick up keys appended since the last read, ignoring a torn last line
+        if not os.path.exists(self.keys_path):
+            return
+        with open(self.keys_path, "rb") as f:
+            f.seek(self._keys_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                self._index.setdefault(line[:-1].decode("ascii"), self._rows)
+                self._rows += 1
+                self._keys_offset += len(line)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def get_many(self, keys):
+        """
+        Look up vectors by key.
+
+        Returns:
+            tuple: A ``(len(keys), dim)`` float32 array and a boolean mask of
+            the keys that were found; rows for missing keys are zero
+        """
+        self._refresh()
+        vectors = np.zeros((len(keys), self.dim), dtype=np.float32)
+        rows = np.array([self._index.get(key, -1) for key in keys], dtype=np.int64)
+        found = rows >= 0
+        if found.any():
+            stored = np.memmap(
+                self.vectors_path,
+                dtype=np.float32,
+                mode="r",
+                shape=(self._rows, self.dim),
+            )
+            vectors[found] = stored[rows[found]]
+        return vectors, found
+
+    def put_many(self, keys, vectors):
+        """Append vectors for keys that are not stored yet."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if vectors.shape != (len(keys), self.dim):
+            raise ValueError(
+                f"Expected vectors of shape ({len(keys)}, {self.dim}), "
+                f"got {vectors.shape}."
+            )
+        with self._locked():
+            self._refresh()
+            new = {}
+            for i, key in enumerate(keys):
+                if key not in self._index and key not in new:
+                    new[key] = i
+            if not new:
+                return
+            with open(self.vectors_path, "ab") as f:
+                # Drop vector rows left by a writer killed before its keys
+                f.truncate(self._rows * self.row_bytes)
+                f.write(vectors[list(new.values())].tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self.keys_path, "ab") as f:
+                # Likewise drop a torn key line before appending
+                f.truncate(self._keys_offset)
+                f.write("".join(f"{key}\n" for key in new).encode("ascii"))
+                f.flush()
+                os.fsync(f.fileno())
+            self._refresh()
@@ -0,0 +1,550 @@
+#!/usr/bin/env python
+import functools
+import gc
+import os
+import time
+
+import numpy as np
+import torch
+from transformers import T5Config, T5EncoderModel, T5Tokenizer, T5TokenizerFast
+from .batching import MemoryBudget, adaptive_batches, plan_batches, prefetch
+from .sequences import process_sequence
+
+# Longest processed sequence (see process_sequence) plus the </s> token
+MAX_SEQUENCE_TOKENS = 1001
+
+
+def default_token_budget():
+    """Padded tokens per batch matching the old worst-case fixed batch size."""
+    if torch.cuda.is_available():
+        return torch.cuda.device_count() * 8 * MAX_SEQUENCE_TOKENS
+    return os.cpu_count() * MAX_SEQUENCE_TOKENS
+
+
+# Tokenized batches prepared ahead of the ProtT5 forward pass
+PREFETCH_BATCHES = 2
+# Share of the memory free after loading that batches may use by default
+DEFAULT_MEMORY_FRACTION = 0.6
+
+
+def available_memory(device):
+    """
+    Bytes free for activations on ``device``.
+
+    On GPU this is the free memory of the fullest device times the device
+    count, as DataParallel splits batches evenly. On CPU it is the lower of
+    the system's available memory and what is left under the cgroup limit,
+    i.e. the SLURM ``--mem`` allocation.
+    """
+    if device.type == "cuda":
+        free = min(
+            torch.cuda.mem_get_info(i)[0] for i in range(torch.cuda.device_count())
+        )
+        return free * torch.cuda.device_count()
+    candidates = []
+    with open("/proc/meminfo") as f:
+        for line in f:
+            if line.startswith("MemAvailable:"):
+                candidates.append(int(line.split()[1]) * 1024)
+    for limit_file, usage_file in (
+        ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory.current"),
+        (
+            "/sys/fs/cgroup/memory/memory.limit_in_bytes",
+            "/sys/fs/cgroup/memory/memory.usage_in_bytes",
+        ),
+    ):
+        try:
+            with open(limit_file) as f:
+                limit = f.read().strip()
+            with open(usage_file) as f:
+                usage = int(f.read())
+        except (OSError, ValueError):
+            continue
+        if limit != "max":
+            candidates.append(max(int(limit) - usage, 0))
+        break
+    return min(candidates) if candidates else None
+
+
+def activation_bytes(config, batch_size, width, element_bytes=4):
+    """
+    Rough peak activation memory of a T5 encoder forward pass.
+
+    Within a layer the hidden states, the feed-forward expansion and the
+    attention scores of every head are live at once; the latter grow with
+    the square of the padded ``width``.
+    """
+    per_token = 4 * config.d_model + config.d_ff + 2 * config.num_heads * width
+    return batch_size * width * per_token * element_bytes
+
+
+def is_out_of_memory(error):
+    """Whether a forward pass failed for lack of GPU or host memory."""
+    message = str(error)
+    return isinstance(error, torch.cuda.OutOfMemoryError) or any(
+        text in message
+        for text in (
+            "out of memory",
+            "can't allocate memory",
+            # ONNX Runtime's allocator
+            "Failed to allocate memory",
+        )
+    )
+
+
+def split_batch(batch, input_ids, attention_mask):
+    """Halve a tokenized batch, trimming padding that neither half needs."""
+    half = len(batch) // 2
+    for part in (slice(0, half), slice(half, None)):
+        mask = attention_mask[part]
+        width = int(mask.sum(dim=1).max())
+        yield batch[part], input_ids[part, :width], mask[:, :width]
+
+
+# Inference precisions of the ProtT5 encoder
+PRECISIONS = ("fp32", "bf16", "int8")
+# Ways of running both encoders: PyTorch as is, torch.compile, or exported
+# ONNX models (see export_encoders.py) on ONNX Runtime's CPU provider
+BACKENDS = ("eager", "compile", "onnx")
+
+
+def prot_t5_onnx_path(model_path):
+    return os.path.join(model_path, "prot_t5_xl_uniref50", "encoder.onnx")
+
+
+def smiles_onnx_path(model_path):
+    return os.path.join(model_path, "trfm_12_23000.onnx")
+
+
+def onnx_session(path):
+    """An ONNX Runtime CPU session using as many threads as PyTorch."""
+    try:
+        import onnxruntime
+    except ImportError:
+        raise ImportError("The onnx backend needs the onnxruntime package.")
+    if not os.path.exists(path):
+        raise FileNotFoundError(
+            f"{path} does not exist; create it with emmai export-encoders export."
+        )
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = torch.get_num_threads()
+    return onnxruntime.InferenceSession(
+        path, options, providers=["CPUExecutionProvider"]
+    )
+
+
+class T5EncoderForExport(torch.nn.Module):
+    """
+    The T5 encoder stack with a shape-independent relative position bias.
+
+    ``T5EncoderModel`` builds its position bias from Python ints, which a
+    traced export freezes at the example's width. Here the positions come
+    from the input tensor instead; outputs equal ``last_hidden_state``.
+    """
+
+    def __init__(self, model):
+        super().__init__()
+        self.encoder = model.encoder
+
+    def forward(self, input_ids, attention_mask):
+        hidden = self.encoder.embed_tokens(input_ids)
+        attention = self.encoder.block[0].layer[0].SelfAttention
+        positions = torch.cumsum(torch.ones_like(input_ids[0]), 0) - 1
+        buckets = attention._relative_position_bucket(
+            positions[None, :] - positions[:, None],
+            bidirectional=True,
+            num_buckets=attention.relative_attention_num_buckets,
+            max_distance=attention.relative_attention_max_distance,
+        )
+        bias = attention.relative_attention_bias(buckets).permute(2, 0, 1)[None]
+        # Padding is masked through the bias, as T5Stack does
+        mask = attention_mask[:, None, None, :].to(hidden.dtype)
+        bias = bias + (1.0 - mask) * torch.finfo(hidden.dtype).min
+        for block in self.encoder.block:
+            hidden = block.layer[0](hidden, position_bias=bias)[0]
+            hidden = block.layer[1](hidden)
+        return self.encoder.final_layer_norm(hidden)
+
+
+class ProtT5Encoder:
+    """
+    ProtT5 tokenizer and encoder loaded for inference at a given precision.
+
+    ``fp32`` is the reference. ``bf16`` runs the forward pass under bfloat16
+    autocast. ``int8`` applies dynamic int8 quantization to the encoder's
+    linear layers and is only available on CPU. Hidden states are always
+    returned as float32.
+
+    The ``compile`` backend wraps the model in ``torch.compile``; ``onnx``
+    runs the exported fp32 encoder on ONNX Runtime instead of loading the
+    PyTorch weights.
+
+    Args:
+        model_path (str): The $UNIKP directory holding prot_t5_xl_uniref50
+        precision (str): One of ``PRECISIONS``
+        fast_tokenizer (bool): Use the Rust tokenizer when it can be built
+            from the model's sentencepiece file
+        backend (str): One of ``BACKENDS``
+    """
+
+    def __init__(
+        self, model_path, precision="fp32", fast_tokenizer=True, backend="eager"
+    ):
+        if precision not in PRECISIONS:
+            raise ValueError(
+                f"Unknown precision {precision!r}, expected one of {PRECISIONS}."
+            )
+        if backend not in BACKENDS:
+            raise ValueError(
+                f"Unknown backend {backend!r}, expected one of {BACKENDS}."
+            )
+        self.precision = precision
+        self.backend = backend
+        self.tokenizer = load_tokenizer(
+            os.path.join(model_path, "prot_t5_xl_uniref50"), fast_tokenizer
+        )
+        if backend == "onnx":
+            if precision != "fp32":
+                raise ValueError("The onnx backend runs the fp32 export only.")
+            self.config = T5Config.from_pretrained(
+                os.path.join(model_path, "prot_t5_xl_uniref50")
+            )
+            self.device = torch.device("cpu")
+            self.session = onnx_session(prot_t5_onnx_path(model_path))
+            return
+
+        model = T5EncoderModel.from_pretrained(
+            os.path.join(model_path, "prot_t5_xl_uniref50")
+        )
+        gc.collect()
+        self.config = model.config
+
+        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        if precision == "int8":
+            if self.device.type != "cpu":
+                raise ValueError("int8 dynamic quantization is only supported on CPU.")
+            model = torch.quantization.quantize_dynamic(
+                model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        if torch.cuda.is_available():
+            print("Let's use", torch.cuda.device_count(), "GPUs!")
+            model = torch.nn.DataParallel(model)
+        else:
+            print("Let's use", os.cpu_count(), "CPUs!")
+        self.model = model.to(self.device).eval()
+        if backend == "compile":
+            # Widths vary from batch to batch, so compile for dynamic shapes
+            self.model = torch.compile(self.model, dynamic=True)
+
+    def forward(self, input_ids, attention_mask):
+        """Last hidden state of a tokenized batch, as float32."""
+        if self.backend == "onnx":
+            (hidden,) = self.session.run(
+                None,
+                {
+                    "input_ids": input_ids.cpu().numpy(),
+                    "attention_mask": attention_mask.cpu().numpy(),
+                },
+            )
+            return torch.from_numpy(hidden)
+        with (
+            torch.no_grad(),
+            torch.autocast(
+                self.device.type,
+                dtype=torch.bfloat16,
+                enabled=self.precision == "bf16",
+            ),
+        ):
+            embedding = self.model(input_ids=input_ids, attention_mask=attention_mask)
+        return embedding.last_hidden_state.float()
+
+
+def load_tokenizer(path, fast=True):
+    """The ProtT5 tokenizer, preferring the fast one, which releases the GIL."""
+    if fast:
+        try:
+            return T5TokenizerFast.from_pretrained(path, do_lower_case=False)
+        except Exception as e:
+            # Building it from spiece.model needs sentencepiece and protobuf
+            print(f"Fast tokenizer unavailable ({e}), using the Python one")
+    return T5Tokenizer.from_pretrained(path, do_lower_case=False)
+
+
+def load_prot_t5(model_path, precision="fp32", fast_tokenizer=True, backend="eager"):
+    """Load the ProtT5 tokenizer and encoder onto the available device."""
+    return ProtT5Encoder(model_path, precision, fast_tokenizer, backend)
+
+
+def Seq_to_vec(
+    Sequence,
+    model_path,
+    token_budget=None,
+    batches=None,
+    encoder=None,
+    precision="fp32",
+    memory_budget=None,
+    backend="eager",
+):
+    """
+    Mean-pooled ProtT5 embeddings of protein sequences.
+
+    Sequences are encoded longest first, in batches sized to a memory
+    allowance from :func:`activation_bytes`. The allowance starts at
+    ``memory_budget`` bytes (by default a share of the memory free once the
+    model is loaded), halves whenever a batch runs out of memory, with the
+    batch split and retried, and grows back while memory is free. Passing
+    ``token_budget`` or ``batches`` uses the fixed plan of
+    :func:`plan_batches` or the given batches instead.
+
+    Each batch is pooled right after its forward pass and written into a
+    preallocated matrix, so peak memory is one batch of hidden states plus
+    the ``(len(Sequence), 1024)`` result, in input order. The encoder from
+    :func:`load_prot_t5` is loaded at ``precision`` on ``backend`` unless
+    passed in.
+    Batches are tokenized, and pinned when on GPU, in a background thread
+    while the encoder runs on the previous one.
+    """
+    sequences_Example = [" ".join(process_sequence(seq)) for seq in Sequence]
+    num_sequences = len(sequences_Example)
+    # One token per residue plus </s>
+    lengths = [len(process_sequence(seq)) + 1 for seq in Sequence]
+
+    if encoder is None:
+        encoder = load_prot_t5(model_path, precision, backend=backend)
+
+    element_bytes = 2 if encoder.precision == "bf16" else 4
+    budget = None
+    if batches is None and token_budget is None and memory_budget is None:
+        free = available_memory(encoder.device)
+        if free is None:
+            token_budget = default_token_budget()
+        else:
+            memory_budget = DEFAULT_MEMORY_FRACTION * free
+    if batches is None and token_budget is not None:
+        batches = plan_batches(lengths, token_budget)
+    elif batches is None:
+        budget = MemoryBudget(memory_budget)
+        print(f"Batch memory allowance {budget.allowed:,} B")
+
+        def max_batch_size(width):
+            return budget.allowed // activation_bytes(
+                encoder.config, 1, width, element_bytes
+            )
+
+        batches = adaptive_batches(lengths, max_batch_size)
+
+    features = np.empty((num_sequences, encoder.config.d_model), dtype=np.float32)
+    pin_memory = encoder.device.type == "cuda"
+    tokenizer_seconds = 0.0
+    encoder_seconds = 0.0
+
+    def tokenized_batches():
+        nonlocal tokenizer_seconds
+        for batch in batches:
+            start = time.perf_counter()
+            batch_ids = encoder.tokenizer(
+                [sequences_Example[i] for i in batch],
+                add_special_tokens=True,
+                padding=True,
+                return_tensors="pt",
+            )
+            input_ids = batch_ids["input_ids"]
+            attention_mask = batch_ids["attention_mask"]
+            if pin_memory:
+                input_ids = input_ids.pin_memory()
+                attention_mask = attention_mask.pin_memory()
+            tokenizer_seconds += time.perf_counter() - start
+            yield batch, input_ids, attention_mask
+
+    def encode(batch, input_ids, attention_mask):
+        input_ids = input_ids.to(encoder.device, non_blocking=pin_memory)
+        attention_mask = attention_mask.to(encoder.device, non_blocking=pin_memory)
+        embedding = encoder.forward(input_ids, attention_mask)
+        with torch.no_grad():
+            features[batch] = mean_pool(embedding, attention_mask).cpu().numpy()
+
+    loop_start = time.perf_counter()
+    for pending in prefetch(tokenized_batches(), PREFETCH_BATCHES):
+        pending = [pending]
+        while pending:
+            batch, input_ids, attention_mask = pending.pop()
+            # Split batches prepared before the allowance was last lowered
+            if budget is not None and len(batch) > 1:
+                needed = activation_bytes(
+                    encoder.config, len(batch), input_ids.shape[1], element_bytes
+                )
+                if needed > budget.allowed:
+                    pending.extend(
+                        reversed(list(split_batch(batch, input_ids, attention_mask)))
+                    )
+                    continue
+            start = time.perf_counter()
+            try:
+                encode(batch, input_ids, attention_mask)
+            except Exception as e:
+                if budget is None or len(batch) == 1 or not is_out_of_memory(e):
+                    raise
+                gc.collect()
+                if encoder.device.type == "cuda":
+                    torch.cuda.empty_cache()
+                budget.shrink()
+                pending.extend(
+                    reversed(list(split_batch(batch, input_ids, attention_mask)))
+                )
+                continue
+            encoder_seconds += time.perf_counter() - start
+            if budget is not None:
+                budget.fitted(available_memory(encoder.device))
+
+    print(
+        f"Encoded {num_sequences} sequences in {time.perf_counter() - loop_start:.1f}s: "
+        f"tokenizer {tokenizer_seconds:.1f}s overlapped with encoder "
+        f"{encoder_seconds:.1f}s"
+    )
+
+    return features
+
+
+def mean_pool(embedding, attention_mask):
+    """Mean of each sequence's residue embeddings, excluding padding and </s>."""
+    mask = attention_mask.clone()
+    # The last attended position of every sequence holds the </s> token
+    eos_positions = attention_mask.sum(dim=1) - 1
+    mask[torch.arange(mask.size(0), device=mask.device), eos_positions] = 0
+    mask = mask.unsqueeze(-1).to(embedding.dtype)
+    return (embedding * mask).sum(dim=1) / mask.sum(dim=1)
+
+
+# Special token ids of the SMILES transformer vocabulary
+PAD_INDEX = 0
+UNK_INDEX = 1
+EOS_INDEX = 2
+SOS_INDEX = 3
+MASK_INDEX = 4
+# Fixed input length of the SMILES transformer, including <sos> and <eos>
+SMILES_SEQ_LEN = 220
+
+
+@functools.lru_cache(maxsize=None)
+def load_smiles_transformer(model_path):
+    """
+    Load the SMILES vocabulary and transformer once per process.
+
+    Returns:
+        tuple: ``(vocab, trfm, device)``
+    """
+    from build_vocab import WordVocab
+    from pretrain_trfm import TrfmSeq2seq
+
+    vocab = WordVocab.load_vocab(os.path.join(model_path, "vocab.pkl"))
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    trfm = TrfmSeq2seq(len(vocab), 256, len(vocab), 4)
+    # Use map_location to ensure the model is loaded on the device if GPU is not available
+    trfm.load_state_dict(
+        torch.load(os.path.join(model_path, "trfm_12_23000.pkl"), map_location=device)
+    )
+    trfm.to(device)
+    trfm.eval()
+    return vocab, trfm, device
+
+
+def get_inputs(sm, vocab):
+    sm = sm.split()
+    if len(sm) > 218:
+        print("SMILES is too long ({:d})".format(len(sm)))
+        sm = sm[:109] + sm[-109:]
+    ids = [vocab.stoi.get(token, UNK_INDEX) for token in sm]
+    ids = [SOS_INDEX] + ids + [EOS_INDEX]
+    seg = [1] * len(ids)
+    padding = [PAD_INDEX] * (SMILES_SEQ_LEN - len(ids))
+    ids.extend(padding), seg.extend(padding)
+    return ids, seg
+
+
+def get_array(smiles, vocab, device):
+    x_id, x_seg = [], []
+    for sm in smiles:
+        a, b = get_inputs(sm, vocab)
+        x_id.append(a)
+        x_seg.append(b)
+    return torch.tensor(x_id).to(device), torch.tensor(x_seg).to(device)
+
+
+class SmilesFeatures(torch.nn.Module):
+    """
+    ``TrfmSeq2seq.encode`` as one module returning a tensor, for export.
+
+    Takes ``(SMILES_SEQ_LEN, batch)`` token ids and returns the mean, max
+    and first position of the last encoder layer and the first position of
+    the one before it, ``(batch, 4 * 256)``.
+    """
+
+    def __init__(self, trfm):
+        super().__init__()
+        self.trfm = trfm
+
+    def forward(self, src):
+        output = self.trfm.pe(self.trfm.embed(src))
+        layers = self.trfm.trfm.encoder.layers
+        for layer in layers[:-1]:
+            output = layer(output, None)
+        penultimate = output
+        output = layers[-1](output, None)
+        if self.trfm.trfm.encoder.norm is not None:
+            output = self.trfm.trfm.encoder.norm(output)
+        return torch.cat(
+            (output.mean(dim=0), output.max(dim=0).values, output[0], penultimate[0]),
+            dim=1,
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def load_smiles_encoder(model_path, backend="eager"):
+    """
+    The SMILES vocabulary and a function from token ids to fingerprints.
+
+    Returns:
+        tuple: ``(vocab, encode, device)``, where ``encode`` maps
+        ``(SMILES_SEQ_LEN, batch)`` ids to a ``(batch, 1024)`` array
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}.")
+    if backend == "onnx":
+        from build_vocab import WordVocab
+
+        vocab = WordVocab.load_vocab(os.path.join(model_path, "vocab.pkl"))
+        session = onnx_session(smiles_onnx_path(model_path))
+
+        def encode(src):
+            return session.run(None, {"src": src.cpu().numpy()})[0]
+
+        return vocab, encode, torch.device("cpu")
+
+    vocab, trfm, device = load_smiles_transformer(model_path)
+    if backend == "eager":
+        return vocab, trfm.encode, device
+    features = torch.compile(SmilesFeatures(trfm).eval())
+
+    def encode(src):
+        return features(src).cpu().numpy()
+
+    return vocab, encode, device
+
+
+def smiles_to_vec(Smiles, model_path, batch_size=256, backend="eager"):
+    """
+    SMILES transformer fingerprints as one ``(len(Smiles), 1024)`` array.
+
+    Every input is padded to the same fixed length, so encoding in batches
+    gives the same vectors as encoding one SMILES at a time.
+    """
+    from utils import split
+
+    vocab, encode, device = load_smiles_encoder(model_path, backend)
+    X = np.empty((len(Smiles), 4 * 256), dtype=np.float32)
+    for i in range(0, len(Smiles), batch_size):
+        x_split = [split(smile) for smile in Smiles[i : i + batch_size]]
+        xid, xseg = get_array(x_split, vocab, device)
+        with torch.no_grad():
+            X[i : i + len(x_split)] = encode(torch.t(xid))
+    return X
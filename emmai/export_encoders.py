@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+"""
+Export the UniKP encoders to ONNX and check the backends against eager.
+
+``export`` writes the fp32 ProtT5 encoder to
+``$UNIKP/prot_t5_xl_uniref50/encoder.onnx`` and the SMILES transformer to
+``$UNIKP/trfm_12_23000.onnx``, used by ``unikp_backend: onnx``. ``verify``
+encodes the first sequences of a FASTA file and a fixed list of SMILES with
+each backend and compares them with the eager PyTorch models.
+
+    emmai export-encoders export
+    emmai export-encoders verify --backends compile onnx
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+from Bio.SeqIO.FastaIO import SimpleFastaParser
+
+DEFAULT_FASTA = os.path.join(
+    os.path.dirname(__file__), "..", "test", "PAO1", "protein.faa"
+)
+SMILES = [
+    "C(C1C(C(C(C(O1)O)O)O)O)O",
+    "CC(=O)C(=O)O",
+    "C(C(=O)O)C(CC(=O)O)(C(=O)O)O",
+    "C(CC(=O)O)C(C(=O)O)N",
+    "C1=NC(=C2C(=N1)N(C=N2)C3C(C(C(O3)COP(=O)(O)OP(=O)(O)OP(=O)(O)O)O)O)N",
+    "C(C(=O)O)N",
+]
+
+
+def export_t5_encoder(model, input_ids, attention_mask, path):
+    """
+    Export a ``T5EncoderModel`` to ONNX with dynamic batch and width.
+
+    Args:
+        model (transformers.T5EncoderModel): The encoder, on CPU
+        input_ids (torch.Tensor): Example token ids, best with padding
+        attention_mask (torch.Tensor): Their attention mask
+        path (str): The ONNX file to write
+    """
+    from .encoders import T5EncoderForExport
+
+    # A new module starts in training mode, which would export dropout
+    wrapper = T5EncoderForExport(model).eval()
+    torch.onnx.export(
+        wrapper,
+        (input_ids, attention_mask),
+        path,
+        input_names=["input_ids", "attention_mask"],
+        output_names=["last_hidden_state"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "width"},
+            "attention_mask": {0: "batch", 1: "width"},
+            "last_hidden_state": {0: "batch", 1: "width"},
+        },
+        opset_version=17,
+        dynamo=False,
+    )
+
+
+def export_prot_t5(model_path):
+    from .encoders import load_prot_t5, prot_t5_onnx_path
+
+    encoder = load_prot_t5(model_path)
+    model = encoder.model.module if hasattr(encoder.model, "module") else encoder.model
+    # Two rows of different lengths, so the export sees a padding mask
+    tokens = encoder.tokenizer(
+        ["M K T A Y I A K Q R", "M S L"],
+        add_special_tokens=True,
+        padding=True,
+        return_tensors="pt",
+    )
+    path = prot_t5_onnx_path(model_path)
+    export_t5_encoder(model.cpu(), tokens["input_ids"], tokens["attention_mask"], path)
+    return path
+
+
+def export_smiles_features(trfm, path):
+    """
+    Export ``TrfmSeq2seq.encode``, as ``SmilesFeatures``, with a dynamic batch.
+
+    Args:
+        trfm (TrfmSeq2seq): The SMILES transformer, on CPU
+        path (str): The ONNX file to write
+    """
+    from .encoders import SMILES_SEQ_LEN, SmilesFeatures
+
+    features = SmilesFeatures(trfm).eval()
+    src = torch.zeros((SMILES_SEQ_LEN, 2), dtype=torch.long)
+    with torch.no_grad():
+        torch.onnx.export(
+            features,
+            (src,),
+            path,
+            input_names=["src"],
+            output_names=["features"],
+            dynamic_axes={"src": {1: "batch"}, "features": {0: "batch"}},
+            opset_version=17,
+            dynamo=False,
+        )
+
+
+def export_smiles(model_path):
+    from .encoders import load_smiles_transformer, smiles_onnx_path
+
+    _, trfm, _ = load_smiles_transformer(model_path)
+    path = smiles_onnx_path(model_path)
+    export_smiles_features(trfm.cpu(), path)
+    return path
+
+
+def read_sequences(fasta, num_sequences):
+    sequences = []
+    with open(fasta) as handle:
+        for _, seq in SimpleFastaParser(handle):
+            sequences.append(seq)
+            if len(sequences) == num_sequences:
+                break
+    return sequences
+
+
+def compare(name, expected, actual):
+    """Print the largest absolute difference and lowest cosine similarity."""
+    difference = float(np.abs(actual - expected).max())
+    cosine = np.sum(expected * actual, axis=1) / (
+        np.linalg.norm(expected, axis=1) * np.linalg.norm(actual, axis=1)
+    )
+    print(f"{name:>24} max|d| {difference:.2e}  cos min {cosine.min():.7f}")
+    return difference
+
+
+def verify(model_path, backends, fasta, num_sequences, tolerance):
+    """Whether every backend is within ``tolerance`` of the eager encoders."""
+    from .encoders import Seq_to_vec, load_prot_t5, smiles_to_vec
+
+    sequences = read_sequences(fasta, num_sequences)
+    smiles = [SMILES[i % len(SMILES)] for i in range(num_sequences)]
+    outputs = {}
+    for backend in ["eager"] + [b for b in backends if b != "eager"]:
+        start = time.perf_counter()
+        encoder = load_prot_t5(model_path, backend=backend)
+        vectors = Seq_to_vec(sequences, model_path, encoder=encoder)
+        fingerprints = smiles_to_vec(smiles, model_path, backend=backend)
+        print(f"{backend}: {time.perf_counter() - start:.1f}s including loading")
+        outputs[backend] = vectors, fingerprints
+
+    worst = 0.0
+    for backend, (vectors, fingerprints) in outputs.items():
+        if backend == "eager":
+            continue
+        worst = max(
+            worst,
+            compare(f"{backend} ProtT5", outputs["eager"][0], vectors),
+            compare(f"{backend} SMILES", outputs["eager"][1], fingerprints),
+        )
+    print(f"Largest difference {worst:.2e}, tolerance {tolerance:.0e}")
+    return worst <= tolerance
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description=__doc__.splitlines()[1])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("export", help="write the ONNX encoders into $UNIKP")
+    check = subparsers.add_parser("verify", help="compare backends with eager")
+    check.add_argument("--backends", nargs="+", default=["compile", "onnx"])
+    check.add_argument("--fasta", default=DEFAULT_FASTA)
+    check.add_argument("--num-sequences", type=int, default=16)
+    check.add_argument("--tolerance", type=float, default=1e-3)
+    args = parser.parse_args(argv)
+
+    model_path = os.environ.get("UNIKP")
+    if model_path is None:
+        raise ValueError("The UNIKP environment variable is not set.")
+    sys.path.append(model_path)
+    if args.command == "export":
+        for export in (export_prot_t5, export_smiles):
+            print(f"Wrote {export(model_path)}")
+    elif not verify(
+        model_path, args.backends, args.fasta, args.num_sequences, args.tolerance
+    ):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
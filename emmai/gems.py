@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+
+def contains_keywords(cell, keywords):
+    """Whether ``cell`` mentions any of ``keywords``, ignoring case."""
+    return any(keyword.lower() in str(cell).lower() for keyword in keywords)
+
+
+def read_model(path):
+    """Read an SBML model with cobra, without its parser warnings."""
+    import cobra
+
+    logging.getLogger("cobra").setLevel(logging.ERROR)
+    return cobra.io.read_sbml_model(path)
+
+
+def ec_model_path(config, suffix):
+    """
+    Path of an enzyme-constrained model written by the later stages.
+
+    Args:
+        config (emmai.config.Config): The run's settings
+        suffix (str): ``mod1``, ``mod2`` or ``final``
+
+    Returns:
+        str: ``output_GEMs/ec_<sbml model name>_<suffix>.xml`` in the output
+        directory, which is created if needed
+    """
+    directory = os.path.join(config.output_dir, "output_GEMs")
+    os.makedirs(directory, exist_ok=True)
+    name = os.path.splitext(config["sbml_model"])[0]
+    return os.path.join(directory, f"ec_{name}_{suffix}.xml")
+
+
+def add_metabolite_coefficients(metabolite, coefficients):
+    """
+    Add ``metabolite`` to many reactions with one solver update.
+
+    Gives the same model as ``reaction.add_metabolites({metabolite:
+    coefficient})`` for each reaction, which rewrites the solver constraint of
+    every metabolite of the reaction on each call. Here the reactions'
+    stoichiometry is changed directly and the constraint of ``metabolite`` is
+    written once. Unlike ``add_metabolites``, this is not undone on leaving a
+    ``with model:`` block.
+
+    Args:
+        metabolite (cobra.Metabolite): A metabolite of the reactions' model
+        coefficients (dict): Maps reactions to the coefficient to add; zero
+            totals remove the metabolite from the reaction
+    """
+    linear = {}
+    for reaction, coefficient in coefficients.items():
+        coefficient += reaction._metabolites.get(metabolite, 0)
+        reaction._metabolites[metabolite] = coefficient
+        metabolite._reaction.add(reaction)
+        if coefficient == 0:
+            reaction._metabolites.pop(metabolite)
+            metabolite._reaction.remove(reaction)
+        linear[reaction.forward_variable] = coefficient
+        linear[reaction.reverse_variable] = -coefficient
+    if metabolite.model is not None and linear:
+        metabolite.model.constraints[metabolite.id].set_linear_coefficients(linear)
+
+
+# When the model building runner writes the stage 3 and 4 models: not at all,
+# before going on, or from a copy in a background thread
+INTERMEDIATE_WRITES = ("none", "sync", "async")
+
+
+class SBMLWriter:
+    """
+    Writes models to SBML now or in a background thread.
+
+    In ``async`` mode :meth:`write` takes a copy of the model, so the caller
+    can keep changing it, and one background thread writes the copies in
+    order. :meth:`close` waits for them and raises the first write error.
+
+    Args:
+        mode (str): ``sync`` or ``async``
+    """
+
+    def __init__(self, mode="sync"):
+        if mode not in ("sync", "async"):
+            raise ValueError(f"Unknown write mode {mode!r}, expected sync or async.")
+        self.mode = mode
+        self._executor = ThreadPoolExecutor(max_workers=1) if mode == "async" else None
+        self._pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, model, path, copy=True):
+        """Write ``model``; ``copy=False`` if it will not change any more."""
+        import cobra
+
+        if self._executor is None:
+            cobra.io.write_sbml_model(model, path)
+            print(f"Wrote {path}")
+            return
+        if copy:
+            model = model.copy()
+        self._pending.append(
+            (path, self._executor.submit(cobra.io.write_sbml_model, model, path))
+        )
+
+    def close(self):
+        if self._executor is None:
+            return
+        try:
+            for path, future in self._pending:
+                future.result()
+                print(f"Wrote {path}")
+        finally:
+            self._pending = []
+            self._executor.shutdown()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+import re
+
+import pandas as pd
+
+SEQS_SMILES_COLUMNS = [
+    "Gene ID",
+    "Gene name",
+    "Sequence",
+    "Reaction ID",
+    "Reaction name",
+    "Reaction",
+    "Direction",
+    "Substrate Name",
+    "Substrate ID",
+    "Substrate Smiles",
+    "Kcat",
+]
+
+
+def normalize_gene_id(gene_id):
+    # Remove the 'G_' prefix and replace '_<integer>' with '.<integer>'
+    if re.match(r"^G_.*_\d+$", gene_id):
+        gene_id = re.sub(r"^G_(.*)_(\d+)$", r"\1.\2", gene_id)
+    return gene_id
+
+
+def substrate_edges(model, cofactors):
+    """
+    Extract the (gene, reaction, direction, metabolite) edges of a model.
+
+    Every reactant of a gene's reactions is a forward substrate, and the
+    products of reversible reactions are reverse substrates. Metabolites whose
+    name is a cofactor are left out. Each reaction is only visited once,
+    however many genes catalyse it.
+
+    Returns:
+        tuple: The gene list as a DataFrame (``Gene ID``, ``Gene name``) and
+        the edge table with one row per gene, reaction, direction and substrate
+    """
+    cofactors = set(cofactors)
+    reaction_rows = {}
+    gene_ids, gene_names = [], []
+    edge_gene_ids, edge_gene_names, edge_reaction_ids = [], [], []
+
+    for gene in model.genes:
+        if gene.id == "spontaneous":
+            continue
+        gene_id = normalize_gene_id(gene.id)
+        gene_ids.append(gene_id)
+        gene_names.append(gene.name)
+        for r in gene.reactions:
+            if r.id not in reaction_rows:
+                reaction = r.reaction
+                rows = [
+                    (r.id, r.name, reaction, "Forward", m.name, m.id)
+                    for m in r.reactants
+                    if m.name not in cofactors
+                ]
+                if r.reversibility:
+                    rows.extend(
+                        (r.id, r.name, reaction, "Reverse", m.name, m.id)
+                        for m in r.products
+                        if m.name not in cofactors
+                    )
+                reaction_rows[r.id] = rows
+            edge_gene_ids.append(gene_id)
+            edge_gene_names.append(gene.name)
+            edge_reaction_ids.append(r.id)
+
+    genes = pd.DataFrame({"Gene ID": gene_ids, "Gene name": gene_names})
+    gene_reactions = pd.DataFrame(
+        {
+            "Gene ID": edge_gene_ids,
+            "Gene name": edge_gene_names,
+            "Reaction ID": edge_reaction_ids,
+        }
+    )
+    reactions = pd.DataFrame(
+        [row for rows in reaction_rows.values() for row in rows],
+        columns=[
+            "Reaction ID",
+            "Reaction name",
+            "Reaction",
+            "Direction",
+            "Substrate Name",
+            "Substrate ID",
+        ],
+    )
+    edges = gene_reactions.merge(reactions, on="Reaction ID", how="inner")
+    return genes, edges
+
+
+def pair_sequences_smiles(genes, edges, genes_df, metabolites_df):
+    """
+    Join substrate edges to gene sequences and metabolite SMILES.
+
+    Args:
+        genes (pandas.DataFrame): Gene list from :func:`substrate_edges`
+        edges (pandas.DataFrame): Edge table from :func:`substrate_edges`
+        genes_df (pandas.DataFrame): gene_sequence_data.csv indexed by Gene ID
+        metabolites_df (pandas.DataFrame): metabolite_smiles_data.csv indexed
+            by metabolite_id
+
+    Returns:
+        tuple: The sequences_smiles table, the gene ids missing from
+        ``genes_df`` and the metabolite ids missing from ``metabolites_df``
+    """
+    # Only the first row of a duplicated id is used, as with a .loc lookup
+    sequences = genes_df.loc[~genes_df.index.duplicated(), ["Sequence"]]
+    smiles = metabolites_df.loc[~metabolites_df.index.duplicated(), ["smiles"]]
+
+    # Anti-join: genes without a sequence record contribute no rows
+    known_genes = genes["Gene ID"].isin(sequences.index)
+    missing_gene_ids = genes.loc[~known_genes, "Gene ID"].tolist()
+
+    paired = edges.merge(
+        sequences, left_on="Gene ID", right_index=True, how="inner"
+    ).merge(
+        smiles.rename(columns={"smiles": "Substrate Smiles"}),
+        left_on="Substrate ID",
+        right_index=True,
+        how="left",
+        indicator=True,
+    )
+    # Anti-join: substrates without a SMILES record
+    missing = paired["_merge"] == "left_only"
+    missing_metabolite_ids = paired.loc[missing, "Substrate ID"].tolist()
+
+    seqs_smiles_df = paired.loc[~missing].assign(Kcat="")[SEQS_SMILES_COLUMNS]
+    return (
+        seqs_smiles_df.reset_index(drop=True),
+        missing_gene_ids,
+        missing_metabolite_ids,
+    )
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+import os
+import sqlite3
+import threading
+import time
+
+NOT_FOUND = "Compound not found"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pubchem_names (
+    name TEXT PRIMARY KEY,
+    smiles TEXT,
+    fetched_at REAL NOT NULL
+)
+"""
+
+
+def normalize_name(name):
+    """Cache key for a metabolite name: case and whitespace insensitive."""
+    return " ".join(str(name).split()).casefold()
+
+
+class PubChemCache:
+    """
+    On-disk cache of PubChem name to SMILES lookups.
+
+    Hits and misses are both stored; a miss is a row with a NULL SMILES value
+    and is returned as ``"Compound not found"``. Entries older than their TTL
+    are treated as absent so they are fetched again.
+
+    The cache is a single SQLite file that can live in a directory shared by
+    several SLURM jobs. It uses the rollback journal rather than WAL, because
+    WAL needs shared memory that network file systems do not provide, and a
+    generous busy timeout so concurrent writers wait for the lock instead of
+    failing.
+
+    Args:
+        cache_dir (str): Directory holding ``pubchem_cache.sqlite``
+        ttl_days (float): Lifetime of a cached hit in days
+        negative_ttl_days (float): Lifetime of a cached miss in days
+        timeout (float): Seconds to wait for a lock held by another writer
+    """
+
+    def __init__(self, cache_dir, ttl_days=180, negative_ttl_days=30, timeout=60.0):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "pubchem_cache.sqlite")
+        self.ttl = ttl_days * 86400
+        self.negative_ttl = negative_ttl_days * 86400
+        self.timeout = timeout
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(_SCHEMA)
+
+    def _connect(self):
+        # sqlite3 connections cannot be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute("PRAGMA journal_mode=DELETE")
+            self._local.conn = conn
+        return conn
+
+    def get(self, name):
+        """
+        Return the cached SMILES, ``"Compound not found"`` for a cached miss,
+        or ``None`` if the name is not cached or has expired.
+        """
+        try:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT smiles, fetched_at FROM pubchem_names WHERE name = ?",
+                    (normalize_name(name),),
+                )
+                .fetchone()
+            )
+        except sqlite3.Error as e:
+            print(f"Error reading PubChem cache {self.path}: {e}")
+            return None
+        if row is None:
+            return None
+        smiles, fetched_at = row
+        ttl = self.ttl if smiles is not None else self.negative_ttl
+        if time.time() - fetched_at > ttl:
+            return None
+        return smiles if smiles is not None else NOT_FOUND
+
+    def put(self, name, smiles):
+        """Store a hit, or a miss when ``smiles`` is None or not found."""
+        if smiles == NOT_FOUND:
+            smiles = None
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO pubchem_names (name, smiles, fetched_at) "
+                    "VALUES (?, ?, ?)",
+                    (normalize_name(name), smiles, time.time()),
+                )
+        except sqlite3.Error as e:
+            # A cache write failure should never stop the pipeline
+            print(f"Error writing PubChem cache {self.path}: {e}")
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .pubchem_cache import NOT_FOUND, normalize_name
+
+PUBCHEM_BASE_URL = "https://pubchem.ncbi.nlm.nih.gov/rest/pug"
+# Responses worth retrying: throttling and transient server errors
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket limiting how often requests may start.
+
+    Args:
+        rate (float): Tokens added per second
+        capacity (float): Maximum burst size, defaults to ``rate``
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError("The token bucket rate must be positive.")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1.0))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available and take it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class PubChemResolver:
+    """
+    Resolve metabolite names to isomeric SMILES with the PubChem PUG REST API.
+
+    Any number of threads may call :meth:`resolve` concurrently. Request starts
+    are shared through one token bucket so the combined rate stays under the
+    PubChem limit of 5 requests per second. Throttled and transient failures
+    are retried with exponential backoff and full jitter, and a ``Retry-After``
+    header is honoured when present. Concurrent lookups of the same name are
+    collapsed into a single request.
+
+    Args:
+        cache (PubChemCache): Optional persistent cache consulted before,
+            and updated after, each request
+        requests_per_second (float): Sustained request rate
+        max_retries (int): Retries after the first attempt
+        backoff (float): Base backoff in seconds
+        max_backoff (float): Upper bound of a single backoff in seconds
+        timeout (float): Per-request timeout in seconds
+        base_url (str): PUG REST root, overridable for a local stub server
+        pool_size (int): Kept-alive connections, at least the number of
+            threads calling :meth:`resolve`
+    """
+
+    def __init__(
+        self,
+        cache=None,
+        requests_per_second=5.0,
+        max_retries=5,
+        backoff=1.0,
+        max_backoff=60.0,
+        timeout=30.0,
+        base_url=PUBCHEM_BASE_URL,
+        pool_size=10,
+    ):
+        self.cache = cache
+        self.bucket = TokenBucket(requests_per_second)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.url = f"{base_url.rstrip('/')}/compound/name/property/IsomericSMILES/JSON"
+        # Retries are done here, under the rate limit, not by the adapter
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session = requests.Session()
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, name):
+        """
+        Return the SMILES for ``name`` or ``"Compound not found"``.
+
+        Raises the last error if PubChem could not be reached after all
+        retries; such failures are not cached.
+        """
+        key = normalize_name(name)
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+        if not owner:
+            return future.result()
+
+        try:
+            smiles = self.cache.get(name) if self.cache is not None else None
+            if smiles is None:
+                smiles = self._query(name)
+                if self.cache is not None:
+                    self.cache.put(name, smiles)
+        except Exception as e:
+            # Let a later caller try again rather than replaying the failure
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+        future.set_result(smiles)
+        return smiles
+
+    def _query(self, name):
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            retry_after = None
+            try:
+                # POST keeps names containing '/' or '#' out of the URL path
+                response = self._session.post(
+                    self.url, data={"name": name}, timeout=self.timeout
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            else:
+                if response.status_code == 200:
+                    properties = response.json()["PropertyTable"]["Properties"]
+                    for entry in properties:
+                        # Newer PUG REST releases report IsomericSMILES as SMILES
+                        smiles = entry.get("IsomericSMILES") or entry.get("SMILES")
+                        if smiles:
+                            return smiles
+                    return NOT_FOUND
+                if response.status_code == 404:
+                    return NOT_FOUND
+                if response.status_code not in RETRY_STATUS:
+                    response.raise_for_status()
+                error = requests.HTTPError(
+                    f"PubChem returned HTTP {response.status_code}", response=response
+                )
+                retry_after = response.headers.get("Retry-After")
+
+            if attempt == self.max_retries:
+                raise error
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+            if retry_after is not None:
+                try:
+                    delay = max(delay, float(retry_after))
+                except ValueError:
+                    pass
+            time.sleep(delay)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+import numpy as np
+from Bio.Data import IUPACData
+from Bio.SeqIO.FastaIO import SimpleFastaParser
+
+# Average mass of water lost per peptide bond, as in Bio.SeqUtils.molecular_weight
+WATER_WEIGHT = 18.0153
+
+_RESIDUE_WEIGHTS = np.full(256, np.nan)
+for _residue, _weight in IUPACData.protein_weights.items():
+    _RESIDUE_WEIGHTS[ord(_residue)] = _weight
+
+
+def process_sequence(seq):
+    """Keep the first and last 500 residues of sequences longer than ProtT5's 1000."""
+    if len(seq) > 1000:
+        return seq[:500] + seq[-500:]
+    return seq
+
+
+def iter_fasta_for_ids(fasta_path, wanted_ids):
+    """
+    Stream ``(record_id, sequence)`` pairs for the FASTA records in ``wanted_ids``.
+
+    Records are read one at a time with the plain-string parser, so only the
+    matching sequences are ever held by the caller. The record id is the first
+    word of the header, as with ``SeqIO.parse``.
+    """
+    with open(fasta_path, "r") as handle:
+        for title, sequence in SimpleFastaParser(handle):
+            record_id = title.split(None, 1)[0] if title else ""
+            if record_id in wanted_ids:
+                yield record_id, sequence
+
+
+def molecular_weights(sequences):
+    """
+    Average molecular weights of many protein sequences at once.
+
+    Equivalent to ``Bio.SeqUtils.molecular_weight(seq, seq_type="protein")``
+    applied to each sequence, but computed from one residue-weight lookup over
+    the concatenated sequences. Sequences containing a letter without an
+    unambiguous weight get NaN instead of raising.
+
+    Args:
+        sequences (list[str]): Protein sequences
+
+    Returns:
+        numpy.ndarray: One weight in Da per sequence
+    """
+    sequences = ["".join(seq.split()).upper() for seq in sequences]
+    lengths = np.fromiter((len(seq) for seq in sequences), dtype=np.int64)
+    masses = np.full(len(sequences), np.nan)
+    if not len(sequences) or not lengths.sum():
+        return masses
+
+    codes = np.frombuffer(
+        "".join(sequences).encode("ascii", errors="replace"), dtype=np.uint8
+    )
+    weights = _RESIDUE_WEIGHTS[codes]
+    # reduceat needs strictly valid start offsets, so empty sequences are skipped
+    non_empty = lengths > 0
+    starts = (np.cumsum(lengths) - lengths)[non_empty]
+    totals = np.add.reduceat(weights, starts)
+    masses[non_empty] = totals - (lengths[non_empty] - 1) * WATER_WEIGHT
+    return masses
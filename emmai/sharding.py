@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+import glob
+import os
+import re
+
+import pandas as pd
+
+from .checkpoint import read_checkpoint
+
+PAIR_COLUMNS = ["Substrate Smiles", "Sequence", "Kcat"]
+
+_SHARD_FILE = re.compile(r"shard-(\d+)-of-(\d+)\.csv$")
+# A shard's CSV file and the checkpoint journal and settings beside it
+_SHARD_FILES = re.compile(
+    r"shard-(\d+)-of-(\d+)\.csv(\.journal|\.journal\.compacting|\.settings\.json)?$"
+)
+
+
+def parse_shard(spec):
+    """Parse an ``"index/count"`` shard spec, e.g. ``"2/8"``, into integers."""
+    try:
+        index, count = (int(part) for part in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"Expected a shard as 'index/count', got {spec!r}.")
+    if not 0 <= index < count:
+        raise ValueError(f"Shard index {index} is not in 0..{count - 1}.")
+    return index, count
+
+
+def shard_from_environment():
+    """The ``(index, count)`` of a SLURM array task, or None outside one."""
+    index = os.getenv("SLURM_ARRAY_TASK_ID")
+    count = os.getenv("SLURM_ARRAY_TASK_COUNT")
+    if index is None or count is None:
+        return None
+    # Arrays are expected to be numbered from 0, e.g. --array=0-7
+    return parse_shard(f"{index}/{count}")
+
+
+def shard_of(keys, count):
+    """
+    Shard number of each hex content key, the same in every process.
+
+    Args:
+        keys (list[str]): sha256 hex digests, e.g. from ``sequence_key``
+        count (int): Number of shards
+
+    Returns:
+        list[int]: The shard of each key
+    """
+    return [int(key[:16], 16) % count for key in keys]
+
+
+def shard_path(shard_dir, index, count):
+    return os.path.join(shard_dir, f"shard-{index}-of-{count}.csv")
+
+
+def remove_stale_shards(shard_dir, count):
+    """Remove the shard files of runs with another shard ``count``."""
+    for path in glob.glob(os.path.join(shard_dir, "shard-*-of-*.csv*")):
+        match = _SHARD_FILES.search(path)
+        if match and int(match.group(2)) != count:
+            os.remove(path)
+            print(f"Removed {path}, left by a run with {match.group(2)} shards")
+
+
+def read_shards(shard_dir, count=None):
+    """
+    Combine the pair results of a complete set of shard files.
+
+    Args:
+        shard_dir (str): Directory of the shard files
+        count (int): Shard count of the current run. If not given, files of
+            several counts are only accepted if just one count is complete.
+
+    Raises:
+        FileNotFoundError: If there are no shard files or one is missing
+        ValueError: If the files come from runs with different shard counts
+            and the current one cannot be told apart
+    """
+    found = {}
+    for path in glob.glob(os.path.join(shard_dir, "shard-*-of-*.csv")):
+        match = _SHARD_FILE.search(path)
+        if match:
+            found[int(match.group(1)), int(match.group(2))] = path
+    if not found:
+        raise FileNotFoundError(f"No shard results in {shard_dir}.")
+    counts = {shard_count for _, shard_count in found}
+
+    def complete(shard_count):
+        return all((index, shard_count) in found for index in range(shard_count))
+
+    if count is None:
+        if len(counts) == 1:
+            count = next(iter(counts))
+        else:
+            complete_counts = [c for c in counts if complete(c)]
+            if len(complete_counts) != 1:
+                raise ValueError(
+                    f"Shard results in {shard_dir} mix shard counts "
+                    f"{sorted(counts)}; remove the stale files and rerun."
+                )
+            count = complete_counts[0]
+    stale = sorted(counts - {count})
+    if stale:
+        print(
+            f"Warning: Ignoring shard results in {shard_dir} with shard counts "
+            f"{stale}, reading those of {count} shards."
+        )
+    missing = [index for index in range(count) if (index, count) not in found]
+    if missing:
+        raise FileNotFoundError(
+            f"Shards {missing} of {count} have no results in {shard_dir}."
+        )
+    return pd.concat(
+        [read_checkpoint(found[index, count], PAIR_COLUMNS) for index in range(count)],
+        ignore_index=True,
+    )
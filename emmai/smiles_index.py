@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+import os
+import pickle
+
+import pandas as pd
+
+SMILES_REF_DB_COLUMNS = [
+    "kegg_metabolite_ID",
+    "Metabolite_aliases",
+    "BiGG_metabolite_name",
+    "SMILES",
+]
+# Bump when the layout of the pickled index changes
+INDEX_VERSION = 1
+
+
+def index_path_for(csv_path):
+    """Location of the lookup index that sits next to the reference CSV."""
+    return os.path.splitext(csv_path)[0] + ".index.pkl"
+
+
+def _csv_signature(csv_path):
+    stat = os.stat(csv_path)
+    return INDEX_VERSION, stat.st_size, stat.st_mtime_ns
+
+
+def build_smiles_index(csv_path):
+    """
+    Build the name and alias lookup tables from SMILES_reference_DB.csv.
+
+    Every entry maps to a ``(kegg_metabolite_ID, SMILES)`` tuple. As with the
+    original column scans only the first matching row is kept for each name or
+    alias, and a missing SMILES value is stored as ``None``.
+    """
+    smiles_db = pd.read_csv(csv_path, usecols=SMILES_REF_DB_COLUMNS)
+    smiles_db = smiles_db.astype(object).where(smiles_db.notna(), None)
+
+    by_name = {}
+    by_alias = {}
+    for kegg_id, aliases, name, smiles in zip(
+        smiles_db["kegg_metabolite_ID"],
+        smiles_db["Metabolite_aliases"],
+        smiles_db["BiGG_metabolite_name"],
+        smiles_db["SMILES"],
+    ):
+        entry = (kegg_id, smiles)
+        if name is not None:
+            by_name.setdefault(str(name), entry)
+        if aliases is not None:
+            for alias in str(aliases).split("|"):
+                by_alias.setdefault(alias, entry)
+    return {"by_name": by_name, "by_alias": by_alias}
+
+
+def load_smiles_index(csv_path):
+    """
+    Load the SMILES lookup index, rebuilding it when the CSV has changed.
+
+    The index is cached as a pickle next to the CSV and is keyed on the CSV
+    size and modification time, so replacing the reference database triggers a
+    rebuild on the next run.
+    """
+    index_path = index_path_for(csv_path)
+    signature = _csv_signature(csv_path)
+    if os.path.exists(index_path):
+        try:
+            with open(index_path, "rb") as f:
+                cached = pickle.load(f)
+            if cached.get("signature") == signature:
+                return cached["index"]
+        except Exception as e:
+            print(f"Ignoring unreadable SMILES index {index_path}: {e}")
+
+    index = build_smiles_index(csv_path)
+    # Write to a temporary file first so concurrent jobs never read a partial index
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            pickle.dump(
+                {"signature": signature, "index": index},
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(tmp_path, index_path)
+    except OSError as e:
+        print(f"Could not save SMILES index to {index_path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return index
+
+
+def lookup_smiles(index, name):
+    """
+    Return the ``(kegg_metabolite_ID, SMILES)`` entry for a metabolite name.
+
+    The exact BiGG name takes precedence over the ``|``-separated aliases.
+    Returns ``None`` when the name is not in the reference database.
+    """
+    entry = index["by_name"].get(name)
+    if entry is None:
+        entry = index["by_alias"].get(name)
+    return entry
@@ -0,0 +1,19 @@
+"""
+The pipeline stages, in the order they run.
+
+Each stage module has a ``run(config)`` function taking the
+:class:`emmai.config.Config` of a run, and imports its heavy dependencies
+only when run.
+"""
+
+# CLI name of each stage and the module implementing it
+STAGES = {
+    "data-retrieval": "data_retrieval",
+    "unikp": "unikp",
+    "model-modification": "model_modification",
+    "patching": "patching",
+    "calibration": "calibration",
+}
+
+# Runners of several stages in one process, e.g. stages 3 to 5 on one model
+RUNNERS = {"build-model": "build_model"}
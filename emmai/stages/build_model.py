@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+"""
+Stages 3 to 5 on one in-memory model.
+
+Reads the original SBML model once and passes it from model modification
+to patching to calibration, instead of each stage writing an SBML file for
+the next one to parse. Writes ``output_GEMs/ec_<model>_final.xml`` and, if
+asked, the ``mod1`` and ``mod2`` models in between.
+"""
+
+from ..gems import INTERMEDIATE_WRITES, SBMLWriter, ec_model_path, read_model
+from .calibration import calibrate
+from .model_modification import modify_model
+from .patching import patch_model
+
+
+def run(config, intermediates=None):
+    """
+    Build, patch and calibrate the enzyme-constrained model.
+
+    Args:
+        config (emmai.config.Config): The run's settings
+        intermediates (str): Whether to write the stage 3 and 4 models:
+            ``none``, ``sync`` or ``async`` (from a copy, in a background
+            thread); defaults to ``ec_model_intermediates`` in inputs.yml
+
+    Returns:
+        cobra.Model: The calibrated model
+    """
+    intermediates = intermediates or config.get("ec_model_intermediates", "none")
+    if intermediates not in INTERMEDIATE_WRITES:
+        raise ValueError(
+            f"Unknown intermediate writes {intermediates!r}, "
+            f"expected one of {INTERMEDIATE_WRITES}."
+        )
+
+    with SBMLWriter("async" if intermediates == "async" else "sync") as writer:
+        model = read_model(config.path("sbml_model"))
+        # The calibrated model is summarized; intermediate ones are not solved
+        modify_model(config, model, summaries=False)
+        if intermediates != "none":
+            writer.write(model, ec_model_path(config, "mod1"))
+        patch_model(config, model)
+        if intermediates != "none":
+            writer.write(model, ec_model_path(config, "mod2"))
+        calibrate(config, model)
+        writer.write(model, ec_model_path(config, "final"), copy=False)
+    return model
@@ -0,0 +1,27 @@
+#!/usr/bin/env python
+"""
+Stage 5: protein pool calibration.
+
+Applies the configured medium and ``DM_usage`` bounds to the stage 4 model,
+and writes ``output_GEMs/ec_<model>_final.xml``.
+"""
+
+import cobra
+
+from ..gems import ec_model_path, read_model
+
+
+def calibrate(config, ec_model):
+    """Set the medium and protein pool of the patched model and solve it."""
+    ec_model.medium = config["media"]
+    ec_model.reactions.DM_usage.bounds = tuple(config["bounds"])
+    sol = ec_model.optimize()
+
+    print(ec_model.summary(sol))
+    return ec_model
+
+
+def run(config):
+    """Calibrate the stage 4 model and write the final model."""
+    ec_model = calibrate(config, read_model(ec_model_path(config, "mod2")))
+    cobra.io.write_sbml_model(ec_model, ec_model_path(config, "final"))
@@ -0,0 +1,468 @@
+#!/usr/bin/env python
+"""
+Stage 1: gene sequences, metabolite SMILES and their substrate pairs.
+
+Sequences come from the configured protein FASTA file or from UniProt,
+SMILES from the reference database or PubChem. Both are checkpointed, and
+the paired table is written to ``sequences_smiles.csv``.
+"""
+
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List
+
+import pandas as pd
+
+from ..checkpoint import (
+    append_journal,
+    compact_checkpoint,
+    journal_path_for,
+    read_checkpoint,
+)
+from ..gems import read_model
+from ..pairing import pair_sequences_smiles, substrate_edges
+from ..pubchem_cache import PubChemCache
+from ..pubchem_resolver import PUBCHEM_BASE_URL, PubChemResolver
+from ..sequences import iter_fasta_for_ids, molecular_weights
+from ..smiles_index import load_smiles_index, lookup_smiles
+from ..uniprot import make_session, prefetch_proteome, query_genes
+
+DEBUG = False
+
+# Reference SMILES database, looked for in the working directory by default
+SMILES_REFERENCE_DB = "SMILES_reference_DB.csv"
+
+GENE_COLUMNS = [
+    "Gene ID",
+    "Gene name",
+    "Accession",
+    "Sequence",
+    "Mass",
+    "EC number",
+    "Organism",
+    "Gene reactions",
+]
+
+# Define a locks for accessing data structures
+batch_updates_lock = threading.Lock()
+processed_values_lock = threading.Lock()
+
+
+def batch_loop_setup(file_to_update, df_columns, column_key):
+    # Check if checkpointing activated, resuming from the CSV and its journal
+    values_df = read_checkpoint(file_to_update, df_columns, repair=True)
+    # Update list of already processed
+    processed_values = set(values_df[column_key].unique())
+
+    # Process in batches
+    batch_updates = []
+    batch_size = 200
+    return values_df, processed_values, batch_updates, batch_size
+
+
+"""Reusable function to run in parallel for various IO tasks"""
+
+
+def process_futures(
+    futures,
+    processed_values,
+    column_key,
+    batch_updates,
+    batch_size,
+    file_to_update,
+    df_columns,
+):
+    # Finished batches are appended to the journal, so checkpoint cost is
+    # linear and a killed job keeps everything up to the last batch
+    journal_path = journal_path_for(file_to_update)
+    for future in as_completed(futures):
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"Error processing results for {column_key}: {e}")
+            continue
+        if result:
+            # Tasks may return a single row or a list of rows
+            rows = result if isinstance(result, list) else [result]
+            with batch_updates_lock:
+                batch_updates.extend(rows)
+            with processed_values_lock:
+                processed_values.update(row[column_key] for row in rows)
+
+            # Check if batch size is reached
+            if len(batch_updates) >= batch_size:
+                with batch_updates_lock:
+                    if len(batch_updates) >= batch_size:
+                        append_journal(journal_path, batch_updates)
+                        # Clear batch updates after saving
+                        batch_updates = []
+
+    # After the loop, save any remaining updates and compact into the CSV
+    with batch_updates_lock:
+        append_journal(journal_path, batch_updates)
+        batch_updates = []
+    compact_checkpoint(file_to_update, df_columns)
+
+
+def get_smiles_from_csv_apis(name, smiles_index, pubchem_resolver):
+    try:
+        # Get direct match if possible, otherwise fall back to the aliases
+        entry = lookup_smiles(smiles_index, name)
+        # If a match is found, return the 'smiles' for the match
+        if entry is not None:
+            keggid, smiles_value = entry
+            try:
+                if smiles_value is not None:
+                    smiles = str(smiles_value).split("|")[0]
+                else:
+                    smiles = "Compound not found"
+                if DEBUG:
+                    print(
+                        f"DEBUG: SYNONYM keggid: {keggid} name: {name} smile: {smiles}"
+                    )
+                return smiles
+            except Exception as e:
+                print(
+                    f"Error while generating SMILES from Metabolite name: {e} - name: {name} SMILES: {smiles_value}"
+                )
+    except Exception as e:
+        print(f"Error while searching for Metabolite name: {e}")
+
+    try:
+        # Looking for corresponding metabolite smiles in the cache / PubChem API
+        smiles = pubchem_resolver.resolve(name)
+        if DEBUG:
+            print(f"DEBUG: API name: {name} smile: {smiles}")
+        return smiles
+    except Exception as e:
+        print(f"Error while querying PubChem API: {e}")
+
+    # try:
+    #     # Looking for corresponding metabolite smiles using the ChemSpider API
+    #     cs = ChemSpider(config["chem_spider_key"])
+    #     simple_name = remove_characters_within_brackets(name)
+    #     results = cs.search(simple_name)
+    #     if results:
+    #         try:
+    #             smiles = results[0].smiles
+    #             if DEBUG:
+    #                 print(f"SPIDER name: {name} smile: {smiles}")
+    #             return smiles
+    #         except Exception as e:
+    #             print(f"Error while processing ChemSpider API response: {e}")
+    #     print(f"SMILE NOT FOUND FOR name: {name} simple name: {simple_name}")
+    # except Exception as e:
+    #     print(f"Error while querying ChemSpider API: {e}")
+
+    # If no match is found
+    return "Compound not found"
+
+
+def remove_characters_within_brackets(text):
+    # Pattern to match content within brackets (including the brackets themselves)
+    pattern = r"\s*\([^)]*\)"
+    # Replace matched content with an empty string
+    cleaned_text = re.sub(pattern, "", text)
+    return cleaned_text
+
+
+def uniprot_gene_name(gene):
+    gene_name = gene.name
+
+    pattern = r"^G_.*_\d+$"
+
+    if re.match(pattern, gene_name):
+        # Remove the 'G_' prefix and replace '_<integer>' with '.<integer>'
+        gene_name = re.sub(r"^G_(.*)_(\d+)$", r"\1.\2", gene_name)
+    return gene_name
+
+
+def process_uniprot_chunk(
+    genes, processed_genes, uniprot_session, species, strain, proteome_index
+):
+    """Resolve a chunk of genes with one UniProt query per organism level"""
+    pending = [
+        (uniprot_gene_name(gene), gene)
+        for gene in genes
+        if gene.name not in processed_genes
+    ]
+    if not pending:
+        return None
+    names = list(dict.fromkeys(name for name, _ in pending))
+
+    found = {}
+    # Try with strain first
+    try:
+        query = f'organism_name:"{species}" AND strain:"{strain}"'
+        if proteome_index is not None:
+            # Resolve offline against the prefetched strain proteome
+            strain_matches = {
+                name: proteome_index[name] for name in names if name in proteome_index
+            }
+        else:
+            strain_matches = query_genes(uniprot_session, query, names)
+        for name, entry in strain_matches.items():
+            # Entries without a sequence are looked for at species level
+            if entry[3] is not None:
+                found[name] = (entry, strain)
+    except Exception as e:
+        print(f"Error processing {', '.join(names)} for strain {strain}: {e}")
+    missing = [name for name in names if name not in found]
+    for name in missing:
+        print(f"Sequence for strain {strain} and {name} is none")
+
+    # Then try with species
+    try:
+        query = f'organism_name:"{species}"'
+        for name, entry in query_genes(uniprot_session, query, missing).items():
+            if entry[3] is not None:
+                found[name] = (entry, species)
+    except Exception as e:
+        print(f"Error processing {', '.join(missing)} for species {species}: {e}")
+    for name in missing:
+        if name not in found:
+            print(f"Sequence for strain {species} and {name} is none")
+
+    results = []
+    for name, gene in pending:
+        if name not in found:
+            continue
+        (accession, mass, ec, seq), organism = found[name]
+        results.append(
+            {
+                "Gene ID": gene.id,
+                "Gene name": gene.name,
+                "Accession": accession,
+                "Sequence": seq,
+                "Mass": mass,
+                "EC number": ec,
+                "Organism": organism,
+                "Gene reactions": [r.id for r in gene.reactions],
+            }
+        )
+    return results
+
+
+def process_metabolite_model(m, processed_metabolites, smiles_index, pubchem_resolver):
+    if m.id not in processed_metabolites:
+        name = m.name
+        # if m.formula is not None and m.formula in name:
+        # name = name.replace(m.formula, "")
+        try:
+            # Looking for corresponding metabolite smiles in PubChem CSV / API and ChemSpider
+            smiles = get_smiles_from_csv_apis(name, smiles_index, pubchem_resolver)
+            if DEBUG:
+                print(f"DEBUG: type(smiles)={type(smiles)}, smiles={smiles}")
+            # Need to cater for different returns
+            smiles = (
+                "Compound not found"
+                if pd.isna(smiles)
+                else str(smiles).strip().split("|")[0]
+            )
+            if DEBUG:
+                print(f"DEBUG: name {name} smiles {smiles}")
+
+            # Collect data for batch update
+            return {"metabolite_id": m.id, "name": m.name, "smiles": smiles}
+
+        except Exception as e:
+            print(f"Error processing {m.id}: {e}")
+            # Handle error (e.g., log it, attempt to recover, skip this metabolite, etc.)
+
+
+def sequences_from_fasta(model, protein_file_path, file_to_update):
+    """Gene-sequence retrieval from fasta file"""
+    columns: List[str] = GENE_COLUMNS
+    genes = {}
+    for gene in model.genes:
+        gene.id = gene.id.replace("_", ".")
+        genes[gene.id] = gene
+
+    # Join streamed FASTA records to model genes through the gene id dict
+    record_ids = []
+    sequences = []
+    for record_id, sequence in iter_fasta_for_ids(protein_file_path, genes):
+        record_ids.append(record_id)
+        sequences.append(sequence)
+    masses = molecular_weights(sequences)
+    for record_id, mass in zip(record_ids, masses):
+        if pd.isna(mass):
+            print(f"Could not compute the mass of {record_id}: ambiguous residues")
+
+    data = []
+    for record_id, sequence, mass in zip(record_ids, sequences, masses):
+        gene = genes[record_id]
+        data.append(
+            {
+                "Gene ID": record_id,
+                "Gene name": record_id,
+                "Accession": None,
+                "Sequence": sequence,
+                "Mass": mass,
+                "EC number": None,
+                "Organism": None,
+                "Gene reactions": [r.id for r in gene.reactions],
+            }
+        )
+    genes_df = pd.DataFrame(data, columns=columns)
+    genes_df.to_csv(file_to_update, index=False)
+
+
+def sequences_from_uniprot(config, model, file_to_update):
+    """Gene-sequence retrieval from UniProt"""
+    species = config["species"]
+    strain = config["strain"]
+    # Initialise checkpointing
+    df_columns = GENE_COLUMNS
+    column_key = "Gene name"
+    genes_df, processed_genes, batch_updates, batch_size = batch_loop_setup(
+        file_to_update, df_columns, column_key
+    )
+    batch_size = 100
+    # Many genes per request, so requests scale with chunks rather than genes
+    uniprot_batch_size = config.get("uniprot_batch_size", 100)
+    num_cpus = min(os.cpu_count(), 16)
+    uniprot_session = make_session(pool_size=num_cpus)
+    proteome_index = None
+    if config.get("uniprot_prefetch", False):
+        # Download the strain proteome once and reuse it across runs
+        proteome_index = prefetch_proteome(
+            uniprot_session,
+            config.cache_dir,
+            f'organism_name:"{species}" AND strain:"{strain}"',
+        )
+    gene_chunks = [
+        model.genes[i : i + uniprot_batch_size]
+        for i in range(0, len(model.genes), uniprot_batch_size)
+    ]
+    with ThreadPoolExecutor(max_workers=num_cpus) as executor:
+        futures = {
+            executor.submit(
+                process_uniprot_chunk,
+                chunk,
+                processed_genes,
+                uniprot_session,
+                species,
+                strain,
+                proteome_index,
+            ): chunk
+            for chunk in gene_chunks
+        }
+        process_futures(
+            futures,
+            processed_genes,
+            column_key,
+            batch_updates,
+            batch_size,
+            file_to_update,
+            df_columns,
+        )
+
+
+def metabolite_smiles(config, model, file_to_update):
+    """Metabolite-SMILES retrieval"""
+    # Name/alias lookup index, cached next to SMILES_reference_DB.csv
+    reference_db = SMILES_REFERENCE_DB
+    if config.get("smiles_reference_db"):
+        reference_db = config.path("smiles_reference_db")
+    smiles_index = load_smiles_index(reference_db)
+    # Shared cache of API responses, reusable across species and strains
+    pubchem_cache = PubChemCache(
+        config.cache_dir,
+        ttl_days=config.get("pubchem_cache_ttl_days", 180),
+        negative_ttl_days=config.get("pubchem_cache_negative_ttl_days", 30),
+    )
+    # Concurrent PubChem lookups sharing one request-rate limit
+    pubchem_max_workers = config.get("pubchem_max_workers", 8)
+    pubchem_resolver = PubChemResolver(
+        cache=pubchem_cache,
+        requests_per_second=config.get("pubchem_requests_per_second", 5),
+        base_url=config.get("pubchem_base_url") or PUBCHEM_BASE_URL,
+        pool_size=pubchem_max_workers,
+    )
+
+    df_columns = ["metabolite_id", "name", "smiles"]
+    column_key = "metabolite_id"
+    metabolites_df, processed_metabolites, batch_updates, batch_size = batch_loop_setup(
+        file_to_update, df_columns, column_key
+    )
+    batch_size = 100
+    with ThreadPoolExecutor(max_workers=pubchem_max_workers) as executor:
+        futures = {
+            executor.submit(
+                process_metabolite_model,
+                m,
+                processed_metabolites,
+                smiles_index,
+                pubchem_resolver,
+            ): m
+            for m in model.metabolites
+        }
+        process_futures(
+            futures,
+            processed_metabolites,
+            column_key,
+            batch_updates,
+            batch_size,
+            file_to_update,
+            df_columns,
+        )
+
+
+def pair_substrates(config, model):
+    """Pair sequences with adequate substrate SMILES"""
+    output_file_path = config.output_dir
+    metabolite_smiles_path = os.path.join(
+        output_file_path, "metabolite_smiles_data.csv"
+    )
+    gene_sequence_path = os.path.join(output_file_path, "gene_sequence_data.csv")
+
+    # Load data and ensure files are readable
+    try:
+        metabolites_df = pd.read_csv(metabolite_smiles_path, index_col="metabolite_id")
+        genes_df = pd.read_csv(gene_sequence_path, index_col="Gene ID")
+    except Exception as e:
+        print(f"Error loading files: {e}")
+        raise
+
+    # Build the gene-reaction-substrate edge table once and join it to the data
+    # metabolites that should not be considered main substrates of reactions
+    genes, edges = substrate_edges(model, config["cofactors"])
+    seqs_smiles_df, missing_gene_ids, missing_metabolite_ids = pair_sequences_smiles(
+        genes, edges, genes_df, metabolites_df
+    )
+
+    # Save to CSV
+    seqs_smiles_df.to_csv(
+        os.path.join(output_file_path, "sequences_smiles.csv"), index=False
+    )
+
+    # Log missing gene and metabolite IDs
+    if missing_gene_ids:
+        print(
+            f"Warning: The following gene IDs were not found in gene_sequence_data.csv: {set(missing_gene_ids)}"
+        )
+
+    if missing_metabolite_ids:
+        print(
+            f"Warning: The following metabolite IDs were not found in metabolite_smiles_data.csv: {set(missing_metabolite_ids)}"
+        )
+
+
+def run(config):
+    """Retrieve sequences and SMILES and pair them, for stage 2 to predict."""
+    output_file_path = config.output_dir
+    model = read_model(config.path("sbml_model"))
+
+    file_to_update = os.path.join(output_file_path, "gene_sequence_data.csv")
+    if config.get("protein_file_path"):
+        sequences_from_fasta(model, config.path("protein_file_path"), file_to_update)
+    else:
+        sequences_from_uniprot(config, model, file_to_update)
+
+    metabolite_smiles(
+        config, model, os.path.join(output_file_path, "metabolite_smiles_data.csv")
+    )
+    pair_substrates(config, model)
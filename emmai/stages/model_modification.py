@@ -0,0 +1,286 @@
+#!/usr/bin/env python
+"""
+Stage 3: enzyme-constrained model with kcat-based resource usage.
+
+Splits reversible reactions into forward and reverse halves and isozyme
+reactions into one reaction per GPR alternative, then charges each
+reaction with a known kcat to a shared resource-usage pseudometabolite.
+Writes ``output_GEMs/ec_<model>_mod1.xml``.
+"""
+
+import os
+import re
+
+import cobra
+import pandas as pd
+
+from ..gems import (
+    add_metabolite_coefficients,
+    contains_keywords,
+    ec_model_path,
+    read_model,
+)
+
+GREEN = "\033[92m"
+YELLOW = "\033[93m"
+
+
+def split_reversible_reactions(ecmodel, transporters):
+    """Addressing reaction reversibility"""
+    reversible_count = 0
+    for reaction in ecmodel.reactions:
+        if (
+            reaction.reversibility
+            and not contains_keywords(reaction.name, transporters)
+            and reaction not in ecmodel.boundary
+        ):
+            reversible_count += 1
+
+            bwd = reaction.copy()
+            bwd.id = reaction.id + "_rev"
+            bwd.bounds = (-1000.0, 0.0)
+
+            reaction.bounds = (0.0, 1000.0)
+            reaction.id = reaction.id + "_fwr"
+
+            ecmodel.add_reactions([bwd])
+    return reversible_count
+
+
+def split_reaction_by_gpr(base_model, reaction):
+    # Extract the GPR rule of the reaction
+    gpr_rule = reaction.gene_reaction_rule
+    genes = {g.id: g.name for g in reaction.genes}
+    # Split the rule by 'or', considering the precedence of 'and'
+    parts = [part.strip() for part in gpr_rule.split(" or ")]
+
+    new_reactions = []
+
+    for i, part in enumerate(parts):
+        # Create a new reaction for each part
+        new_reaction_id = f"{reaction.id}_iso{i + 1}"
+        new_reaction = cobra.Reaction(new_reaction_id)
+        new_reaction.name = f"{reaction.name} iso{i + 1}"
+        new_reaction.add_metabolites(reaction.metabolites)
+        new_reaction.subsystem = reaction.subsystem
+        new_reaction.lower_bound = reaction.lower_bound
+        new_reaction.upper_bound = reaction.upper_bound
+
+        # Assign GPR rule considering 'and' connections within each part
+        gene_ids_in_part = [g_id for g_id in genes.keys() if g_id in part]
+        new_reaction.gene_reaction_rule = " and ".join(gene_ids_in_part)
+
+        # Add new reaction to the model
+        base_model.add_reactions([new_reaction])
+        new_reactions.append(new_reaction)
+
+    # Remove the original reaction from the model
+    base_model.remove_reactions([reaction])
+
+    return len(new_reactions)
+
+
+def split_isozymes(ecmodel, transporters):
+    """Breaking reactions into isozymes"""
+    isozymes = 0
+    # Reactions added by the split are not visited again
+    for reaction in list(ecmodel.reactions):
+        if (
+            not contains_keywords(reaction.name, transporters)
+            and reaction not in ecmodel.boundary
+            and "or" in reaction.gene_name_reaction_rule
+        ):
+            isozymes = isozymes + split_reaction_by_gpr(ecmodel, reaction) - 1
+    return isozymes
+
+
+def base_reaction_id(reaction_id, known_ids):
+    """
+    Id of the original reaction a split reaction was made from.
+
+    Reversible reactions were split into ``<id>_fwr`` and ``<id>_rev`` and
+    isozymes into ``<id>_iso<N>``, in that order. Suffixes are only stripped
+    while the id is not one of ``known_ids``, so original ids that happen to
+    end like a suffix are kept.
+
+    Returns:
+        str: The first of ``reaction_id``, without ``_iso<N>`` and without
+        both suffixes that is in ``known_ids``, or None
+    """
+    for pattern in ("", r"_iso\d+$", r"(_fwr|_rev)(_iso\d+)?$"):
+        if pattern:
+            reaction_id = re.sub(pattern, "", reaction_id)
+        if reaction_id in known_ids:
+            return reaction_id
+    return None
+
+
+def kcat_index(updated_sns, gene_sequence_mass):
+    """
+    Group the stage 2 kcats for lookup by reaction.
+
+    Args:
+        updated_sns (pandas.DataFrame): sequences_smiles_complete.csv indexed
+            by Gene ID
+        gene_sequence_mass (pandas.DataFrame): gene_sequence_data.csv indexed
+            by Gene ID
+
+    Returns:
+        dict: Maps each (gene id, reaction id, direction, substrate id) with
+        a kcat to its mean kcat, number of kcats and gene mass
+    """
+    kcats = (
+        updated_sns.loc[updated_sns["Kcat"].notna()]
+        .groupby(
+            ["Gene ID", "Reaction ID", "Direction", "Substrate ID"],
+            sort=False,
+        )["Kcat"]
+        .agg(["mean", "count"])
+    )
+    masses = gene_sequence_mass["Mass"]
+    return {
+        key: (mean, count, masses.at[key[0]])
+        for key, mean, count in zip(kcats.index, kcats["mean"], kcats["count"])
+    }
+
+
+def usage_coefficients(ecmodel2, updated_sns, gene_sequence_mass, transporters):
+    """
+    Usage coefficient of each enzymatic reaction with a known kcat.
+
+    A reaction is charged its enzyme mass over its slowest substrate kcat,
+    negative when it runs forward. Split reactions use the kcats of their
+    original reaction in the same direction.
+
+    Returns:
+        dict: Maps reactions to their coefficient of the ``usage``
+        pseudometabolite
+    """
+    index = kcat_index(updated_sns, gene_sequence_mass)
+    known_genes = set(updated_sns.index)
+    known_reactions = set(updated_sns["Reaction ID"])
+    boundary = set(ecmodel2.boundary)
+
+    coefficients = {}
+    for reaction in ecmodel2.reactions:
+        if reaction.lower_bound < 0 and reaction.upper_bound <= 0:
+            direction = "Reverse"
+            reactant_ids = [m.id for m in reaction.products]
+        elif reaction.lower_bound >= 0 and reaction.upper_bound > 0:
+            direction = "Forward"
+            reactant_ids = [m.id for m in reaction.reactants]
+        else:
+            continue
+        if (
+            contains_keywords(reaction.name, transporters)
+            or reaction in boundary
+            or not reaction.genes
+        ):
+            continue
+
+        base_id = base_reaction_id(reaction.id, known_reactions)
+        mass = 0.0
+        # Kcat sums and counts of each substrate, over the reaction's genes
+        preliminary_kcats = {}
+        for g in reaction.genes:
+            g_id = g.id.replace("_", ".")
+            if g_id not in known_genes:
+                print(f"Gene {g.id} not found in seq-smiles relationship table.")
+                continue
+            for substrate in reactant_ids:
+                entry = index.get((g_id, base_id, direction, substrate))
+                if entry is None:
+                    continue
+                kcat, count, gene_mass = entry
+                mass += gene_mass * count
+                total, n = preliminary_kcats.get(substrate, (0.0, 0))
+                preliminary_kcats[substrate] = (total + kcat * count, n + count)
+
+        if preliminary_kcats:
+            kcat = min(total / n for total, n in preliminary_kcats.values())
+            kcat = kcat * 3600  # convert kcat to a /h
+            # convert g/mol (Da) to g/mmol
+            coefficient = (mass * 0.001) / kcat
+
+            if direction == "Forward":
+                coefficient = -coefficient
+            coefficients[reaction] = coefficient
+    return coefficients
+
+
+def add_usage_coefficients(ecmodel2, updated_sns, gene_sequence_mass, transporters):
+    """
+    MASS/KCAT PSEUDOMETABOLITES FOR RESOURCE USAGE
+
+    Adds the ``usage`` pseudometabolite and its ``DM_usage`` demand, and
+    charges each enzymatic reaction its :func:`usage_coefficients`, all in
+    one update of the ``usage`` constraint.
+    """
+    usage = cobra.Metabolite(
+        "usage", name="resource_usage_pseudometabolite", compartment="c"
+    )
+
+    ecmodel2.add_metabolites([usage])
+    ecmodel2.add_boundary(ecmodel2.metabolites.get_by_id("usage"), type="demand")
+    usage_reaction = ecmodel2.reactions.get_by_id("DM_usage")
+    usage_reaction.bounds = (-0.1, 0.0)
+
+    add_metabolite_coefficients(
+        usage,
+        usage_coefficients(ecmodel2, updated_sns, gene_sequence_mass, transporters),
+    )
+
+
+def modify_model(config, model, summaries=True):
+    """
+    Turn ``model`` into the enzyme-constrained model, in place.
+
+    Args:
+        config (emmai.config.Config): The run's settings
+        model (cobra.Model): The original model, as read from ``sbml_model``
+        summaries (bool): Solve and summarize the model before and after
+
+    Returns:
+        cobra.Model: ``model``
+    """
+    output_file_path = config.output_dir
+    transporters = config["transporters"]
+
+    if summaries:
+        sol = model.optimize()
+        print(model.summary(sol))
+
+    original_count = len(model.reactions)
+    reversible_count = split_reversible_reactions(model, transporters)
+    expected_total = original_count + reversible_count
+    print(f"{GREEN}There are {original_count} reactions in the original model")
+    print(f"{GREEN}of which {reversible_count} are reversible.")
+    print(
+        f"{GREEN}Therefore, the expected number of reactions in the ecModel should be {expected_total}"
+    )
+    print(
+        f"{YELLOW}The total number of reactions in the ecModel are {len(model.reactions)}"
+    )
+
+    model.name = "ecPAO1"
+    print(split_isozymes(model, transporters))
+
+    updated_sns = pd.read_csv(
+        os.path.join(output_file_path, "sequences_smiles_complete.csv"),
+        index_col="Gene ID",
+    )
+    gene_sequence_mass = pd.read_csv(
+        os.path.join(output_file_path, "gene_sequence_data.csv"), index_col="Gene ID"
+    )
+    add_usage_coefficients(model, updated_sns, gene_sequence_mass, transporters)
+
+    if summaries:
+        sol = model.optimize()
+        print(model.summary(sol))
+    return model
+
+
+def run(config):
+    """Build the enzyme-constrained model from the stage 2 kcats."""
+    model = modify_model(config, read_model(config.path("sbml_model")))
+    cobra.io.write_sbml_model(model, ec_model_path(config, "mod1"))
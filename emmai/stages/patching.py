@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+Stage 4: resource usage for enzymatic reactions without a kcat.
+
+Charges every remaining reaction the average usage coefficient of the
+stage 3 model, and writes ``output_GEMs/ec_<model>_mod2.xml``.
+"""
+
+import cobra
+
+from ..gems import (
+    add_metabolite_coefficients,
+    contains_keywords,
+    ec_model_path,
+    read_model,
+)
+
+
+def average_usage_coefficient(ec_model):
+    """Average reaction coefficient"""
+    usage_coefficients = []
+
+    for reaction in ec_model.reactions:
+        if "resource_usage_pseudometabolite" in [m.name for m in reaction.metabolites]:
+            for m in reaction.metabolites:
+                if m.id == "usage":
+                    coef = reaction.metabolites[m]
+                    usage_coefficients.append(coef)
+
+    return sum(usage_coefficients) / len(usage_coefficients)
+
+
+def patch_coefficients(patched_model, average_coef, transporters, excluded_reactions):
+    """
+    Average usage coefficient of each reaction that has no usage yet.
+
+    Returns:
+        dict: Maps reactions to their coefficient of the ``usage``
+        pseudometabolite, negative when they run forward
+    """
+    boundary = set(patched_model.boundary)
+    coefficients = {}
+    for reaction in patched_model.reactions:
+        if (
+            reaction not in boundary
+            and not contains_keywords(reaction.name, transporters)
+            and reaction.name not in excluded_reactions
+        ):
+            if "resource_usage_pseudometabolite" not in [
+                m.name for m in reaction.metabolites
+            ]:
+                if reaction.lower_bound < 0 and reaction.upper_bound <= 0:
+                    coefficients[reaction] = abs(average_coef)
+                if reaction.lower_bound >= 0 and reaction.upper_bound > 0:
+                    coefficients[reaction] = -abs(average_coef)
+    return coefficients
+
+
+def patch_usage(patched_model, average_coef, transporters, excluded_reactions):
+    """Add the average coefficient to reactions that have no usage yet."""
+    add_metabolite_coefficients(
+        patched_model.metabolites.get_by_id("usage"),
+        patch_coefficients(
+            patched_model, average_coef, transporters, excluded_reactions
+        ),
+    )
+
+
+def patch_model(config, ec_model):
+    """Patch the stage 3 model with the average usage coefficient, in place."""
+    average_coef = average_usage_coefficient(ec_model)
+    print(abs(average_coef))
+    patch_usage(
+        ec_model, average_coef, config["transporters"], config["excluded_reactions"]
+    )
+    return ec_model
+
+
+def run(config):
+    """Patch the stage 3 model and write it."""
+    ec_model = patch_model(config, read_model(ec_model_path(config, "mod1")))
+    cobra.io.write_sbml_model(ec_model, ec_model_path(config, "mod2"))
@@ -0,0 +1,377 @@
+#!/usr/bin/env python
+"""
+Stage 2: UniKP kcat predictions for the sequence-substrate pairs.
+
+Fills the Kcat column of ``sequences_smiles.csv`` and writes it to
+``sequences_smiles_complete.csv``. Distinct pairs are predicted a chunk of
+sequences at a time and checkpointed, optionally split into shards run by
+local workers or SLURM array tasks and merged afterwards.
+"""
+
+import functools
+import math
+import os
+import subprocess
+import sys
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from ..checkpoint import (
+    append_journal,
+    compact_checkpoint,
+    journal_path_for,
+    match_checkpoint_settings,
+    read_checkpoint,
+)
+from ..embedding_store import EmbeddingStore, sequence_key
+from ..gems import contains_keywords
+from ..sequences import process_sequence
+from ..sharding import (
+    PAIR_COLUMNS,
+    read_shards,
+    remove_stale_shards,
+    shard_from_environment,
+    shard_of,
+    shard_path,
+)
+
+
+def plan_predictions(seqs_smiles_df, transporters):
+    """
+    Collect the rows that still need a Kcat and their distinct pairs.
+
+    Returns:
+        tuple: The rows to fill and the distinct (smiles, sequence) pairs
+    """
+    todo = seqs_smiles_df[
+        seqs_smiles_df["Sequence"].map(lambda seq: type(seq) is not float)
+        & ~seqs_smiles_df["Reaction name"].map(
+            lambda name: contains_keywords(name, transporters)
+        )
+        & seqs_smiles_df["Kcat"].isna()
+        & seqs_smiles_df["Substrate Smiles"].notna()
+        & (seqs_smiles_df["Substrate Smiles"] != "Compound not found")
+    ]
+    pairs = todo[["Substrate Smiles", "Sequence"]].drop_duplicates()
+    return todo, pairs
+
+
+def store_keys(Sequence, precision):
+    # Reduced-precision embeddings are stored apart from the fp32 reference
+    namespace = "prot_t5_xl_uniref50"
+    if precision != "fp32":
+        namespace = f"{namespace}:{precision}"
+    return [sequence_key(process_sequence(seq), namespace) for seq in Sequence]
+
+
+def apply_pair_kcats(seqs_smiles_df, todo, pair_kcats):
+    """Scatter per-pair Kcat results onto every row of ``todo`` they match"""
+    pair_kcats = pair_kcats.drop_duplicates(["Substrate Smiles", "Sequence"])
+    pair_pos = pd.MultiIndex.from_frame(
+        pair_kcats[["Substrate Smiles", "Sequence"]]
+    ).get_indexer(pd.MultiIndex.from_frame(todo[["Substrate Smiles", "Sequence"]]))
+    matched = pair_pos >= 0
+    if not matched.all():
+        print(f"{(~matched).sum()} rows have no Kcat in the results")
+    seqs_smiles_df.loc[todo.index[matched], "Kcat"] = pair_kcats["Kcat"].to_numpy()[
+        pair_pos[matched]
+    ]
+
+
+class KcatPredictor:
+    """
+    UniKP encoders and regressor, configured from ``inputs.yml``.
+
+    The models are those of a running UniKP server when a socket is
+    configured, and are otherwise loaded in-process on first use.
+
+    Args:
+        config (emmai.config.Config): The run's settings
+    """
+
+    def __init__(self, config):
+        self.config = config
+        # Padded tokens per ProtT5 batch; if unset, batches are sized to memory
+        self.token_budget = config.get("prot_t5_token_budget")
+        # Memory ceiling for ProtT5 activations, defaults to a share of what is free
+        memory_budget = config.get("unikp_memory_budget_gb")
+        self.memory_budget = memory_budget and int(memory_budget * 2**30)
+        # ProtT5 inference precision: fp32, bf16 or int8 (CPU only)
+        self.precision = config.get("unikp_precision", "fp32")
+        # How both encoders are run: eager, compile (torch.compile) or onnx
+        self.backend = config.get("unikp_backend", "eager")
+        # SMILES per transformer batch, all padded to 220 tokens
+        self.smiles_batch_size = config.get("smiles_batch_size", 256)
+        # Threads of the kcat regressor, defaults to OMP_NUM_THREADS or the CPU count
+        self.predict_threads = config.get("unikp_predict_threads") or (
+            int(os.getenv("OMP_NUM_THREADS") or 0) or None
+        )
+        # Distinct sequences encoded and checkpointed together
+        self.chunk_size = config.get("unikp_chunk_size", 200)
+        # Socket of a running unikp_server.py, which keeps the models loaded
+        self.server_socket = os.getenv("UNIKP_SERVER_SOCKET") or config.get(
+            "unikp_server_socket"
+        )
+        # UNIKP Python Libraries from bash environment variable
+        self.model_path = os.environ.get("UNIKP")
+        # Shared cache directory, also home of the ProtT5 embedding store
+        self.embedding_store = EmbeddingStore(
+            os.path.join(config.cache_dir, "prot_t5_embeddings")
+        )
+
+    @functools.cached_property
+    def prot_t5_encoder(self):
+        """In-process ProtT5 encoder, loaded (and compiled) once on first use."""
+        from ..encoders import load_prot_t5
+
+        return load_prot_t5(self.model_path, self.precision, backend=self.backend)
+
+    @functools.cached_property
+    def prediction_settings(self):
+        """
+        What the kcats depend on besides the pairs, without loading the models.
+
+        Returns:
+            dict: The ProtT5 ``precision``, encoder ``backend`` and the size
+            of the regressor pickle, of the UniKP server if one is configured
+        """
+        if self.server_socket:
+            from ..unikp_server import UniKPClient
+
+            info = UniKPClient(self.server_socket).info()
+            return {
+                "precision": info["precision"],
+                "backend": info.get("backend"),
+                "regressor_size": info.get("regressor_size"),
+            }
+        if self.model_path is None:
+            raise ValueError("The UNIKP environment variable is not set.")
+        from ..tree_ensemble import kcat_pickle_path
+
+        return {
+            "precision": self.precision,
+            "backend": self.backend,
+            "regressor_size": os.path.getsize(kcat_pickle_path(self.model_path)),
+        }
+
+    @functools.cached_property
+    def backend_functions(self):
+        """
+        Encoders and regressor: a running UniKP server's, or loaded in-process.
+
+        Returns:
+            tuple: ``(encode_sequences, encode_smiles, predict_log10_kcat,
+            precision)``
+        """
+        if self.server_socket:
+            from ..unikp_server import UniKPClient
+
+            client = UniKPClient(self.server_socket)
+            server_precision = client.info()["precision"]
+            if server_precision != self.precision:
+                print(f"Using the UniKP server's {server_precision} precision")
+            return (
+                client.embed_sequences,
+                client.embed_smiles,
+                client.predict_kcat,
+                server_precision,
+            )
+
+        if self.model_path is None:
+            raise ValueError("The UNIKP environment variable is not set.")
+        if self.model_path not in sys.path:
+            sys.path.append(self.model_path)
+        from ..encoders import Seq_to_vec, smiles_to_vec
+        from ..tree_ensemble import load_kcat_regressor
+
+        model = load_kcat_regressor(self.model_path, self.predict_threads)
+
+        def encode_sequences(Sequence):
+            return Seq_to_vec(
+                Sequence,
+                self.model_path,
+                self.token_budget,
+                precision=self.precision,
+                memory_budget=self.memory_budget,
+                encoder=self.prot_t5_encoder,
+            )
+
+        def encode_smiles(Smiles):
+            return smiles_to_vec(
+                Smiles, self.model_path, self.smiles_batch_size, self.backend
+            )
+
+        return encode_sequences, encode_smiles, model.predict, self.precision
+
+    def embed_sequences(self, Sequence, encode_sequences, precision):
+        """Mean-pooled ProtT5 vectors, encoding only sequences not in the store"""
+        keys = store_keys(Sequence, precision)
+        seq_vecs, found = self.embedding_store.get_many(keys)
+        # Each unseen processed sequence is encoded once
+        missing = {}
+        for i, key in enumerate(keys):
+            if not found[i] and key not in missing:
+                missing[key] = Sequence[i]
+        print(f"{len(keys) - len(missing)} of {len(keys)} sequence embeddings cached")
+        if missing:
+            new_vecs = encode_sequences(list(missing.values()))
+            self.embedding_store.put_many(list(missing.keys()), new_vecs)
+            rows = {key: i for i, key in enumerate(missing)}
+            for i, key in enumerate(keys):
+                if not found[i]:
+                    seq_vecs[i] = new_vecs[rows[key]]
+        return seq_vecs
+
+    def predict_pairs(self, pairs):
+        """Kcat of each distinct (smiles, sequence) pair, in the order of ``pairs``"""
+        # Encoder and regressor work scales with distinct inputs, not with rows
+        sequences = list(pd.unique(pairs["Sequence"]))
+        smiles = list(pd.unique(pairs["Substrate Smiles"]))
+        print(
+            f"{len(pairs)} distinct pairs of {len(sequences)} sequences "
+            f"and {len(smiles)} SMILES"
+        )
+        encode_sequences, encode_smiles, predict_log10_kcat, precision = (
+            self.backend_functions
+        )
+        seq_vecs = self.embed_sequences(sequences, encode_sequences, precision)
+        smiles_vecs = encode_smiles(smiles)
+
+        # Fuse the vectors of each distinct pair and predict once per pair
+        seq_pos = pd.Index(sequences).get_indexer(pairs["Sequence"])
+        smiles_pos = pd.Index(smiles).get_indexer(pairs["Substrate Smiles"])
+        fused_vectors = np.concatenate(
+            (smiles_vecs[smiles_pos], seq_vecs[seq_pos]), axis=1
+        )
+        pre_kcats = predict_log10_kcat(fused_vectors)
+        return np.array([math.pow(10, pre_kcat) for pre_kcat in pre_kcats])
+
+    def predict_in_chunks(self, pairs, file_to_update):
+        """
+        Predict pairs a chunk of sequences at a time, journaling each chunk.
+
+        Pairs already in the checkpoint ``file_to_update`` are skipped, so a job
+        killed at its walltime resumes from its last finished chunk. A
+        checkpoint written with other :attr:`prediction_settings` is started
+        over.
+
+        Returns:
+            pandas.DataFrame: Every pair result in the checkpoint
+        """
+        match_checkpoint_settings(file_to_update, self.prediction_settings)
+        done = read_checkpoint(file_to_update, PAIR_COLUMNS, repair=True)
+        done_pairs = pd.MultiIndex.from_frame(done[["Substrate Smiles", "Sequence"]])
+        pairs = pairs[~pd.MultiIndex.from_frame(pairs).isin(done_pairs)]
+        print(f"{len(done)} pairs already predicted, {len(pairs)} to go")
+
+        journal_path = journal_path_for(file_to_update)
+        sequences = pd.unique(pairs["Sequence"])
+        chunk_size = self.chunk_size
+        for start in range(0, len(sequences), chunk_size):
+            chunk = pairs[pairs["Sequence"].isin(sequences[start : start + chunk_size])]
+            chunk = chunk.assign(Kcat=self.predict_pairs(chunk))
+            append_journal(journal_path, chunk.to_dict("records"))
+            print(
+                f"Predicted {min(start + chunk_size, len(sequences))} of "
+                f"{len(sequences)} sequences"
+            )
+
+        compact_checkpoint(file_to_update, PAIR_COLUMNS)
+        if not os.path.exists(file_to_update):
+            # Nothing to predict, but merges still expect the file
+            pd.DataFrame(columns=PAIR_COLUMNS).to_csv(file_to_update, index=False)
+        return read_checkpoint(file_to_update, PAIR_COLUMNS)
+
+
+def run_workers(config, count, threads_per_worker):
+    """Run every shard in a local process with its own threads, then wait."""
+    package_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+    env = dict(
+        os.environ,
+        OMP_NUM_THREADS=str(threads_per_worker),
+        # Workers find the package even when it is not installed
+        PYTHONPATH=os.pathsep.join(
+            filter(None, [package_root, os.environ.get("PYTHONPATH")])
+        ),
+    )
+    env.pop("SLURM_ARRAY_TASK_ID", None)
+    procs = [
+        subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "emmai",
+                "unikp",
+                "--inputs",
+                config.inputs_path,
+                "--shard",
+                f"{i}/{count}",
+            ],
+            env=env,
+        )
+        for i in range(count)
+    ]
+    failed = [i for i, proc in enumerate(procs) if proc.wait() != 0]
+    if failed:
+        raise RuntimeError(f"UniKP shards {failed} of {count} failed.")
+
+
+def run(config, shard=None, workers=None, merge=False):
+    """
+    Predict the missing kcats, or one shard of them.
+
+    Args:
+        config (emmai.config.Config): The run's settings
+        shard (tuple): ``(index, count)`` of the shard to predict and write
+            for a later merge; defaults to the SLURM array task, if any
+        workers (int): Run this many shards in local processes, then merge
+        merge (bool): Only combine the shard results
+    """
+    warnings.filterwarnings(action="ignore", category=UserWarning)
+
+    # Input and output file paths
+    output_file_path = config.output_dir
+    # Local worker processes, each with its own share of the CPU threads
+    workers = workers or config.get("unikp_workers", 1)
+    threads_per_worker = config.get("unikp_threads_per_worker") or max(
+        1, (os.cpu_count() or 1) // workers
+    )
+    if shard is None:
+        shard = shard_from_environment()
+    shard_dir = os.path.join(output_file_path, "unikp_shards")
+
+    seqs_smiles_df = pd.read_csv(os.path.join(output_file_path, "sequences_smiles.csv"))
+    predictor = KcatPredictor(config)
+    todo, pairs = plan_predictions(seqs_smiles_df, config["transporters"])
+    print(f"{len(todo)} rows need a Kcat")
+
+    if merge:
+        apply_pair_kcats(seqs_smiles_df, todo, read_shards(shard_dir))
+    elif shard is None and workers > 1:
+        print(f"Running {workers} workers with {threads_per_worker} threads each")
+        remove_stale_shards(shard_dir, workers)
+        run_workers(config, workers, threads_per_worker)
+        apply_pair_kcats(seqs_smiles_df, todo, read_shards(shard_dir, workers))
+    elif shard is not None:
+        # Shard by sequence so each sequence is only encoded by one shard
+        index, count = shard
+        in_shard = np.array(shard_of(store_keys(pairs["Sequence"], "fp32"), count))
+        print(f"Shard {index} of {count}")
+        os.makedirs(shard_dir, exist_ok=True)
+        predictor.predict_in_chunks(
+            pairs[in_shard == index], shard_path(shard_dir, index, count)
+        )
+    else:
+        pair_kcats = predictor.predict_in_chunks(
+            pairs, os.path.join(output_file_path, "unikp_kcats.csv")
+        )
+        apply_pair_kcats(seqs_smiles_df, todo, pair_kcats)
+
+    # Shards leave the combined table to the merge step
+    if shard is None:
+        seqs_smiles_df.to_csv(
+            os.path.join(output_file_path, "sequences_smiles_complete.csv"),
+            index=False,
+        )
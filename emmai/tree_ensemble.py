@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+"""
+Array-backed copy of the UniKP kcat regressor.
+
+``UniKP for kcat.pkl`` is a scikit-learn tree ensemble that takes a long time
+to unpickle. :func:`convert_forest` writes its trees once as flat node
+arrays, one ``.npy`` file per field, which :class:`ArrayForest` memory-maps
+and walks for all rows and trees at once. Predictions match
+``model.predict`` exactly: samples are cast to float32 and compared with the
+float64 thresholds as in scikit-learn, and tree outputs are summed in tree
+order before dividing by the number of trees.
+
+    emmai tree-ensemble convert "$UNIKP/UniKP for kcat.pkl"
+    emmai tree-ensemble verify "$UNIKP/UniKP for kcat.pkl"
+"""
+
+import argparse
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Node arrays of the converted ensemble, all trees concatenated
+NODE_FIELDS = ("children", "feature", "threshold", "missing_left", "value")
+
+
+def forest_directory(pickle_path):
+    """Directory holding the converted copy of a pickled regressor."""
+    return f"{os.path.splitext(pickle_path)[0]}.trees"
+
+
+def convert_forest(model, directory, source_size=None):
+    """
+    Write the trees of a fitted scikit-learn forest regressor as node arrays.
+
+    ``children`` holds the right then the left child of each node, so a step
+    of the walk is one lookup indexed by the comparison. Leaves point to
+    themselves, so rows that reach a leaf early just stay there.
+    ``source_size`` records the size of the pickle the model came from, so a
+    replaced pickle is not served from stale arrays.
+    """
+    if not hasattr(model, "estimators_") or getattr(model, "n_outputs_", 1) != 1:
+        raise TypeError(
+            f"Expected a single-output forest regressor, got {type(model).__name__}."
+        )
+    fields = {name: [] for name in NODE_FIELDS}
+    roots = []
+    offset = 0
+    max_depth = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        nodes = np.arange(tree.node_count)
+        is_leaf = tree.children_left < 0
+        roots.append(offset)
+        left = np.where(is_leaf, nodes, tree.children_left)
+        right = np.where(is_leaf, nodes, tree.children_right)
+        fields["children"].append(np.stack((right, left), axis=1) + offset)
+        fields["feature"].append(np.where(is_leaf, 0, tree.feature))
+        fields["threshold"].append(tree.threshold)
+        # Trees fitted before missing-value support always send NaN right
+        missing_left = getattr(tree, "missing_go_to_left", None)
+        if missing_left is None:
+            missing_left = np.zeros(tree.node_count, dtype=np.uint8)
+        fields["missing_left"].append(np.asarray(missing_left, dtype=bool) & ~is_leaf)
+        fields["value"].append(tree.value[:, 0, 0])
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+
+    os.makedirs(directory, exist_ok=True)
+    index_dtype = np.int32 if offset < 2**31 else np.int64
+    dtypes = {
+        "children": index_dtype,
+        "feature": np.int32,
+        "threshold": np.float64,
+        "missing_left": bool,
+        "value": np.float64,
+    }
+    for name in NODE_FIELDS:
+        array = np.concatenate(fields[name]).astype(dtypes[name])
+        np.save(os.path.join(directory, f"{name}.npy"), array)
+    np.save(os.path.join(directory, "roots.npy"), np.array(roots, dtype=index_dtype))
+    meta = {
+        "model": type(model).__name__,
+        "n_features": int(model.n_features_in_),
+        "n_trees": len(model.estimators_),
+        "n_nodes": int(offset),
+        "max_depth": int(max_depth),
+        "source_size": source_size,
+    }
+    # Written last, so a directory with meta.json holds a complete conversion
+    with open(os.path.join(directory, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+
+
+class ArrayForest:
+    """
+    Converted forest regressor, memory-mapped from ``directory``.
+
+    Args:
+        directory (str): Output directory of :func:`convert_forest`
+        n_jobs (int): Threads used by :meth:`predict`, each on its own rows
+        batch_size (int): Rows walked together per thread
+    """
+
+    def __init__(self, directory, n_jobs=None, batch_size=256):
+        with open(os.path.join(directory, "meta.json")) as f:
+            self.meta = json.load(f)
+        for name in NODE_FIELDS + ("roots",):
+            array = np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+            # A plain view of the mapping indexes faster than np.memmap
+            setattr(self, name, np.asarray(array))
+        self.n_jobs = n_jobs or os.cpu_count()
+        self.batch_size = batch_size
+
+    def _predict_batch(self, X):
+        # Walk every row down every tree at once, in the flattened samples
+        row_offsets = (np.arange(X.shape[0]) * X.shape[1])[:, None]
+        X = X.ravel()
+        nodes = np.broadcast_to(self.roots, (len(row_offsets), len(self.roots)))
+        for _ in range(self.meta["max_depth"]):
+            x = X[row_offsets + self.feature[nodes]]
+            go_left = (x <= self.threshold[nodes]) | (
+                np.isnan(x) & self.missing_left[nodes]
+            )
+            next_nodes = self.children[nodes, go_left.astype(np.intp)]
+            if np.array_equal(next_nodes, nodes):
+                break
+            nodes = next_nodes
+        values = self.value[nodes]
+        # Sum tree by tree, in order, as ForestRegressor.predict does
+        y = np.zeros(len(row_offsets), dtype=np.float64)
+        for tree in range(values.shape[1]):
+            y += values[:, tree]
+        return y / self.meta["n_trees"]
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.meta["n_features"]:
+            raise ValueError(
+                f"Expected samples with {self.meta['n_features']} features, "
+                f"got shape {X.shape}."
+            )
+        batches = [
+            X[start : start + self.batch_size]
+            for start in range(0, X.shape[0], self.batch_size)
+        ]
+        if not batches:
+            return np.zeros(0, dtype=np.float64)
+        with ThreadPoolExecutor(max_workers=self.n_jobs) as executor:
+            return np.concatenate(list(executor.map(self._predict_batch, batches)))
+
+
+def kcat_pickle_path(model_path):
+    """The pickled UniKP kcat regressor in the UniKP directory."""
+    return os.path.join(model_path, "UniKP for kcat.pkl")
+
+
+def load_kcat_regressor(model_path, n_jobs=None):
+    """
+    The UniKP kcat regressor, from its converted arrays when available.
+
+    Falls back to unpickling ``UniKP for kcat.pkl`` if it has not been
+    converted with ``emmai tree-ensemble convert``.
+    """
+    pickle_path = kcat_pickle_path(model_path)
+    directory = forest_directory(pickle_path)
+    meta_path = os.path.join(directory, "meta.json")
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            source_size = json.load(f).get("source_size")
+        if source_size == os.path.getsize(pickle_path):
+            return ArrayForest(directory, n_jobs)
+        print(f"{directory} was converted from a different pickle, ignoring it")
+    print(
+        f"Unpickling {pickle_path}; convert it with `emmai tree-ensemble` to load faster"
+    )
+    with open(pickle_path, "rb") as f:
+        model = pickle.load(f)
+    if n_jobs is not None and hasattr(model, "n_jobs"):
+        model.n_jobs = n_jobs
+    return model
+
+
+def verify(pickle_path, num_samples, seed, n_jobs):
+    """Compare the converted regressor with the pickled one on fixed samples."""
+    start = time.perf_counter()
+    with open(pickle_path, "rb") as f:
+        model = pickle.load(f)
+    pickle_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    forest = ArrayForest(forest_directory(pickle_path), n_jobs)
+    load_seconds = time.perf_counter() - start
+
+    # Fused vectors lie roughly within the range of the training features
+    rng = np.random.default_rng(seed)
+    X = rng.normal(0, 1, (num_samples, forest.meta["n_features"])).astype(np.float32)
+    # Trees are summed in order only when scikit-learn predicts sequentially
+    model.n_jobs = 1
+    start = time.perf_counter()
+    expected = model.predict(X)
+    sklearn_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    actual = forest.predict(X)
+    array_seconds = time.perf_counter() - start
+
+    mismatches = np.count_nonzero(expected != actual)
+    print(f"load: pickle {pickle_seconds:.2f}s, arrays {load_seconds:.3f}s")
+    print(
+        f"predict {num_samples} samples: scikit-learn {sklearn_seconds:.2f}s, "
+        f"arrays {array_seconds:.2f}s with {forest.n_jobs} threads"
+    )
+    print(f"{mismatches} of {num_samples} predictions differ")
+    return mismatches == 0
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description=__doc__.splitlines()[1])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    convert = subparsers.add_parser("convert", help="convert a pickled regressor")
+    convert.add_argument("pickle_path")
+    check = subparsers.add_parser("verify", help="check predictions match exactly")
+    check.add_argument("pickle_path")
+    check.add_argument("--num-samples", type=int, default=1000)
+    check.add_argument("--seed", type=int, default=0)
+    check.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == "convert":
+        with open(args.pickle_path, "rb") as f:
+            model = pickle.load(f)
+        directory = forest_directory(args.pickle_path)
+        convert_forest(model, directory, os.path.getsize(args.pickle_path))
+        print(f"Wrote {directory}")
+    elif not verify(args.pickle_path, args.num_samples, args.seed, args.threads):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
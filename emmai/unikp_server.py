@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+"""
+Long-lived UniKP inference server on a Unix socket.
+
+Keeps ProtT5, the SMILES transformer and the UniKP kcat regressor loaded, so
+several species can be run through ``emmai unikp`` without reloading
+them each time. Start it with the UniKP directory on ``$UNIKP``:
+
+    emmai unikp-server --socket /tmp/unikp.sock [--precision bf16] [--backend onnx]
+
+and point the pipeline at it with ``unikp_server_socket`` in inputs.yml or
+the ``UNIKP_SERVER_SOCKET`` environment variable. ``--stop`` shuts a running
+server down.
+
+Only the client side is imported by the pipeline; it needs neither torch
+nor the models.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+import traceback
+from multiprocessing.connection import Client, Listener
+
+from .tree_ensemble import kcat_pickle_path, load_kcat_regressor
+
+
+class UniKPServerError(RuntimeError):
+    """Raised by the client when the server fails a request."""
+
+
+class UniKPClient:
+    """
+    Connection to a running UniKP server.
+
+    Args:
+        socket_path (str): Path of the server's Unix socket
+        timeout (float): Seconds to wait for the socket to appear
+    """
+
+    def __init__(self, socket_path, timeout=0):
+        deadline = time.monotonic() + timeout
+        while not os.path.exists(socket_path) and time.monotonic() < deadline:
+            time.sleep(1)
+        self.conn = Client(socket_path, family="AF_UNIX")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def _call(self, method, *args):
+        self.conn.send((method, args))
+        status, value = self.conn.recv()
+        if status != "ok":
+            raise UniKPServerError(value)
+        return value
+
+    def info(self):
+        """The server's settings, e.g. its ProtT5 ``precision``."""
+        return self._call("info")
+
+    def embed_sequences(self, sequences):
+        """Mean-pooled ProtT5 vectors, as :func:`encoders.Seq_to_vec`."""
+        return self._call("embed_sequences", list(sequences))
+
+    def embed_smiles(self, smiles):
+        """SMILES transformer vectors, as :func:`encoders.smiles_to_vec`."""
+        return self._call("embed_smiles", list(smiles))
+
+    def predict_kcat(self, features):
+        """log10 kcat predictions for rows of SMILES then sequence vectors."""
+        return self._call("predict_kcat", features)
+
+    def shutdown(self):
+        """Stop the server once its open requests are answered."""
+        return self._call("shutdown")
+
+
+class UniKPServer:
+    """
+    The three UniKP models, loaded once and served to many clients.
+
+    Requests from different connections are run one at a time, since they
+    share the same models and devices.
+    """
+
+    def __init__(
+        self,
+        model_path,
+        precision="fp32",
+        token_budget=None,
+        batch_size=256,
+        predict_threads=None,
+        memory_budget=None,
+        backend="eager",
+    ):
+        from .encoders import load_prot_t5, load_smiles_encoder
+
+        self.model_path = model_path
+        self.precision = precision
+        self.backend = backend
+        self.token_budget = token_budget
+        self.batch_size = batch_size
+        self.memory_budget = memory_budget
+        self.encoder = load_prot_t5(model_path, precision, backend=backend)
+        load_smiles_encoder(model_path, backend)
+        self.regressor = load_kcat_regressor(model_path, predict_threads)
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def info(self):
+        return {
+            "precision": self.precision,
+            "backend": self.backend,
+            "token_budget": self.token_budget,
+            "smiles_batch_size": self.batch_size,
+            "regressor_size": os.path.getsize(kcat_pickle_path(self.model_path)),
+        }
+
+    def embed_sequences(self, sequences):
+        from .encoders import Seq_to_vec
+
+        return Seq_to_vec(
+            sequences,
+            self.model_path,
+            self.token_budget,
+            encoder=self.encoder,
+            memory_budget=self.memory_budget,
+        )
+
+    def embed_smiles(self, smiles):
+        from .encoders import smiles_to_vec
+
+        return smiles_to_vec(smiles, self.model_path, self.batch_size, self.backend)
+
+    def predict_kcat(self, features):
+        return self.regressor.predict(features)
+
+    def handle(self, conn):
+        methods = {
+            "info": self.info,
+            "embed_sequences": self.embed_sequences,
+            "embed_smiles": self.embed_smiles,
+            "predict_kcat": self.predict_kcat,
+        }
+        with conn:
+            while True:
+                try:
+                    method, args = conn.recv()
+                except EOFError:
+                    return
+                if method == "shutdown":
+                    self._stopping.set()
+                    conn.send(("ok", None))
+                    # Wake the accept loop so it sees the stop flag
+                    Client(self.socket_path, family="AF_UNIX").close()
+                    return
+                try:
+                    with self._lock:
+                        conn.send(("ok", methods[method](*args)))
+                except Exception:
+                    traceback.print_exc()
+                    conn.send(("error", traceback.format_exc()))
+
+    def serve(self, socket_path):
+        self.socket_path = socket_path
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        # Requests are unpickled, so only the owner may connect
+        old_umask = os.umask(0o177)
+        try:
+            listener = Listener(socket_path, family="AF_UNIX")
+        finally:
+            os.umask(old_umask)
+        print(f"UniKP server listening on {socket_path}")
+        with listener:
+            while not self._stopping.is_set():
+                conn = listener.accept()
+                threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+        print("UniKP server stopped")
+
+
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description=__doc__.splitlines()[1])
+    parser.add_argument("--socket", required=True, help="path of the Unix socket")
+    parser.add_argument("--precision", default="fp32", help="fp32, bf16 or int8")
+    parser.add_argument("--backend", default="eager", help="eager, compile or onnx")
+    parser.add_argument("--token-budget", type=int, default=None)
+    parser.add_argument("--smiles-batch-size", type=int, default=256)
+    parser.add_argument("--predict-threads", type=int, default=None)
+    parser.add_argument(
+        "--memory-budget-gb",
+        type=float,
+        default=None,
+        help="memory ceiling for ProtT5 activations (default: 60%% of free memory)",
+    )
+    parser.add_argument(
+        "--stop", action="store_true", help="shut down the server on --socket"
+    )
+    args = parser.parse_args(argv)
+
+    if args.stop:
+        with UniKPClient(args.socket) as client:
+            client.shutdown()
+        return
+
+    model_path = os.environ.get("UNIKP")
+    if model_path is None:
+        raise ValueError("The UNIKP environment variable is not set.")
+    sys.path.append(model_path)
+    server = UniKPServer(
+        model_path,
+        args.precision,
+        args.token_budget,
+        args.smiles_batch_size,
+        args.predict_threads,
+        args.memory_budget_gb and int(args.memory_budget_gb * 2**30),
+        args.backend,
+    )
+    server.serve(args.socket)
+
+
+if __name__ == "__main__":
+    main()
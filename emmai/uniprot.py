@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+import gzip
+import hashlib
+import json
+import os
+import re
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+UNIPROT_STREAM_URL = "https://rest.uniprot.org/uniprotkb/stream"
+UNIPROT_FIELDS = "accession,ec,mass,gene_names,lineage,organism_name,sequence"
+
+
+def make_session(pool_size=16, retries=5):
+    """
+    Keep-alive session for the UniProt REST API.
+
+    Connections are pooled so concurrent chunk queries reuse their TLS
+    sessions, and throttled or transient failures are retried with backoff.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=1.0,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def gene_identifiers(result):
+    """All gene names, synonyms and ordered locus names of a UniProt entry."""
+    identifiers = []
+    for gene in result.get("genes", []):
+        # Check main gene name
+        if "geneName" in gene:
+            identifiers.append(gene["geneName"]["value"])
+        # Check synonyms
+        for synonym in gene.get("synonyms", []):
+            identifiers.append(synonym["value"])
+        # Check in Locus name
+        for entry in gene.get("orderedLocusNames", []):
+            if "value" in entry:
+                identifiers.append(entry["value"])
+    return identifiers
+
+
+def extract_entry(result):
+    """Return ``(accession, mass, ec, sequence)`` for a UniProt JSON entry."""
+    accession = result["primaryAccession"]
+
+    # Get molecular weight and sequence
+    mass = result["sequence"]["molWeight"] if "sequence" in result else None
+    seq = result["sequence"]["value"] if "sequence" in result else None
+
+    # Extract EC number
+    ec = None
+    if "proteinDescription" in result:
+        protein_desc = result["proteinDescription"]
+        if (
+            "recommendedName" in protein_desc
+            and "ecNumbers" in protein_desc["recommendedName"]
+        ):
+            ec_numbers = protein_desc["recommendedName"]["ecNumbers"]
+            if ec_numbers:
+                ec = ec_numbers[0]["value"]
+        elif (
+            "includes" in protein_desc and "recommendedName" in protein_desc["includes"]
+        ):
+            includes_rec = protein_desc["includes"]["recommendedName"]
+            if "ecNumbers" in includes_rec and includes_rec["ecNumbers"]:
+                ec = includes_rec["ecNumbers"][0]["value"]
+
+    return accession, mass, ec, seq
+
+
+def match_results(results, targets):
+    """
+    Assign UniProt entries to the requested gene names.
+
+    Each target is matched to the first entry that lists it as a gene name,
+    synonym or ordered locus name, in the order UniProt returned them.
+
+    Args:
+        results (list): Entries from a UniProt JSON response
+        targets (Iterable[str]): Gene names to look for
+
+    Returns:
+        dict: Gene name to ``(accession, mass, ec, sequence)``
+    """
+    targets = set(targets)
+    matches = {}
+    for result in results:
+        for identifier in gene_identifiers(result):
+            if identifier in targets and identifier not in matches:
+                matches[identifier] = extract_entry(result)
+        if len(matches) == len(targets):
+            break
+    return matches
+
+
+def query_genes(session, organism_query, gene_names, timeout=(10, 300)):
+    """
+    Look up many genes of one organism with a single UniProt stream request.
+
+    Args:
+        session (requests.Session): Session from :func:`make_session`
+        organism_query (str): Organism clause, e.g. ``organism_name:"..."``
+        gene_names (list): Gene names to resolve in this request
+        timeout (tuple): Connect and read timeouts in seconds
+
+    Returns:
+        dict: Gene name to ``(accession, mass, ec, sequence)`` for the genes
+        that were found
+    """
+    if not gene_names:
+        return {}
+    terms = " OR ".join('"{}"'.format(name.replace('"', "")) for name in gene_names)
+    params = {
+        "query": f"({organism_query}) AND ({terms})",
+        "format": "json",
+        "fields": UNIPROT_FIELDS,
+    }
+    response = session.get(UNIPROT_STREAM_URL, params=params, timeout=timeout)
+    response.raise_for_status()
+    return match_results(response.json().get("results", []), gene_names)
+
+
+def proteome_snapshot_path(cache_dir, organism_query):
+    """Local file for the proteome snapshot of one organism query."""
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", organism_query).strip("_")[:80]
+    digest = hashlib.sha1(organism_query.encode("utf-8")).hexdigest()[:10]
+    return os.path.join(cache_dir, "uniprot", f"{slug}_{digest}.json.gz")
+
+
+def fetch_proteome(session, organism_query, path, timeout=(10, 600)):
+    """
+    Stream every UniProt entry matching ``organism_query`` into ``path``.
+
+    The response is transferred gzip-encoded and stored gzipped. It is written
+    to a temporary file first so an interrupted download never leaves a
+    truncated snapshot behind.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    params = {
+        "query": organism_query,
+        "format": "json",
+        "fields": UNIPROT_FIELDS,
+    }
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with session.get(
+        UNIPROT_STREAM_URL,
+        params=params,
+        headers={"Accept-Encoding": "gzip"},
+        stream=True,
+        timeout=timeout,
+    ) as response:
+        response.raise_for_status()
+        with gzip.open(tmp_path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=1 << 20):
+                f.write(chunk)
+    os.replace(tmp_path, path)
+
+
+def load_proteome_index(path):
+    """
+    Index a proteome snapshot by every gene identifier of its entries.
+
+    Identifiers are the primary gene names, synonyms and ordered locus names,
+    and as with :func:`match_results` the first entry listing an identifier
+    wins.
+
+    Returns:
+        dict: Identifier to ``(accession, mass, ec, sequence)``
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        results = json.load(f).get("results", [])
+    index = {}
+    for result in results:
+        entry = None
+        for identifier in gene_identifiers(result):
+            if identifier not in index:
+                if entry is None:
+                    entry = extract_entry(result)
+                index[identifier] = entry
+    return index
+
+
+def prefetch_proteome(session, cache_dir, organism_query):
+    """
+    Return the identifier index of an organism's proteome, downloading the
+    snapshot on first use and reusing it on later runs.
+    """
+    path = proteome_snapshot_path(cache_dir, organism_query)
+    if not os.path.exists(path):
+        print(f"Downloading UniProt proteome for {organism_query} to {path}")
+        fetch_proteome(session, organism_query, path)
+    return load_proteome_index(path)
@@ -15,9 +15,8 @@ mamba activate ${ENV_ID}_cpu
 export OMP_NUM_THREADS=$SLURM_NTASKS
 
 cd ../python_scripts
-python 3_model_modification.py
-echo "Finished 3_model_modification"
-python 4_patching_models.py
-echo "Finished 4_patching_models"
-python 5_protein_pool_calibration.py
-echo "Finished 5_patching_models"
+# Stages 3 to 5 on one in-memory model; the stage scripts
+# 3_model_modification.py, 4_patching_models.py and
+# 5_protein_pool_calibration.py still run them one at a time
+python build_ec_model.py
+echo "Finished build_ec_model"
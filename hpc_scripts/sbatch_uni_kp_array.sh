@@ -0,0 +1,23 @@
+#!/bin/bash
+#SBATCH --job-name=emmai_uni_kp_array    # Job name
+#SBATCH --output=logs/SLURM-%x.%A_%a.out  # Standard output and error log
+#SBATCH --error=logs/SLURM-%x.%A_%a.err   # Error log
+#SBATCH --array=0-3                       # One task per shard, numbered from 0
+#SBATCH --nodes=1                         # Run on a single Node
+#SBATCH --ntasks-per-node=4               # Number of CPU cores per task
+#SBATCH --mem=8GB                         # Total memory limit
+#SBATCH --time=00:10:00                   # Time limit hrs:min:sec
+#SBATCH --partition=defq
+#
+# Each array task predicts one shard of the distinct sequences and writes its
+# results to unikp_shards/ in the output directory; run
+# sbatch_uni_kp_merge.sh afterwards to build sequences_smiles_complete.csv.
+
+# set up environment
+. ../../env.sh
+mamba activate ${ENV_ID}_cpu
+
+export OMP_NUM_THREADS=$SLURM_NTASKS
+
+cd ../python_scripts
+python 2_uni_kp_prot.py
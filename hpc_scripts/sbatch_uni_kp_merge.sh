@@ -0,0 +1,16 @@
+#!/bin/bash
+#SBATCH --job-name=emmai_uni_kp_merge    # Job name
+#SBATCH --output=logs/SLURM-%x.%j.out     # Standard output and error log
+#SBATCH --error=logs/SLURM-%x.%j.err      # Error log
+#SBATCH --nodes=1                         # Run on a single Node
+#SBATCH --ntasks-per-node=1               # Number of CPU cores per task
+#SBATCH --mem=2GB                         # Total memory limit
+#SBATCH --time=00:05:00                   # Time limit hrs:min:sec
+#SBATCH --partition=defq
+
+# set up environment
+. ../../env.sh
+mamba activate ${ENV_ID}_cpu
+
+cd ../python_scripts
+python 2_uni_kp_prot.py --merge
@@ -0,0 +1,40 @@
+#!/bin/bash
+#SBATCH --job-name=emmai_uni_kp_server   # Job name
+#SBATCH --output=logs/SLURM-%x.%j.out     # Standard output and error log
+#SBATCH --error=logs/SLURM-%x.%j.err      # Error log
+#SBATCH --nodes=1                         # Run on a single Node
+#SBATCH --ntasks-per-node=4               # Number of CPU cores per task
+#SBATCH --mem=16GB                        # Total memory limit
+#SBATCH --time=01:00:00                   # Time limit hrs:min:sec
+#SBATCH --gpus-per-node=2
+#SBATCH --partition=gpu
+#
+# Run the UniKP step for several species against one warm inference server,
+# so the models are loaded once. Pass the INPUTS directory of each species:
+#
+#   sbatch sbatch_uni_kp_server.sh ${ANALYSES_ROOT}/PAO1 ${ANALYSES_ROOT}/iML1515
+
+# set up environment
+. ../../env.sh
+mamba activate ${ENV_ID}_gpu
+
+export OMP_NUM_THREADS=$SLURM_NTASKS
+export UNIKP_SERVER_SOCKET=${TMPDIR:-/tmp}/unikp-${SLURM_JOB_ID:-$$}.sock
+
+cd ../python_scripts
+python unikp_server.py --socket "$UNIKP_SERVER_SOCKET" &
+server_pid=$!
+trap 'python unikp_server.py --socket "$UNIKP_SERVER_SOCKET" --stop; wait $server_pid' EXIT
+
+# Wait for the models to load
+while [ ! -S "$UNIKP_SERVER_SOCKET" ]; do
+    kill -0 $server_pid || exit 1
+    sleep 5
+done
+
+status=0
+for inputs in "$@"; do
+    echo "UniKP for ${inputs}"
+    INPUTS="$inputs" python 2_uni_kp_prot.py || status=1
+done
+exit $status
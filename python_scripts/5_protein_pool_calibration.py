@@ -1,38 +1,11 @@
 #!/usr/bin/env python
-import cobra
-import os
-import yaml
-
-inputs_path = os.getenv("INPUTS")  # From your env.sh file
-if inputs_path is None:
-    raise ValueError("The INPUTS environment variable is not set.")
-inputs_file = os.path.join(inputs_path, "inputs.yml")
-with open(inputs_file, "r") as file:
-    data = yaml.safe_load(file)
+"""Runs ``emmai calibration``; kept for the batch scripts and existing workflows."""
 
-# Input and output file paths
-output_file_path = os.path.join(inputs_path, data["output_file_path"])
-sbml_model = os.path.join(inputs_path, data["sbml_model"])
-modified_model_name = os.path.splitext(data["sbml_model"])[0]
-modified_model_file = os.path.join(
-    output_file_path, "output_GEMs", f"ec_{modified_model_name}_final.xml"
-)
-os.makedirs(output_file_path, exist_ok=True)
-transporters = data["transporters"]
-media = data["media"]
-bounds = tuple(data["bounds"])
-
-ec_model = cobra.io.read_sbml_model(
-    os.path.join(output_file_path, "output_GEMs", f"ec_{modified_model_name}_mod2.xml")
-)
+import os
+import sys
 
-ec_model.medium = media
-ec_model.reactions.DM_usage.bounds = bounds
-sol = ec_model.optimize()
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
 
-print(ec_model.summary(sol))
-# print(sol.objective_value)
+from emmai.cli import main  # noqa: E402
 
-cobra.io.write_sbml_model(
-    ec_model, os.path.join(output_file_path, "output_GEMs", modified_model_file)
-)
+main(["calibration"] + sys.argv[1:])
@@ -0,0 +1,11 @@
+#!/usr/bin/env python
+"""Runs ``emmai unikp-server``; kept for the batch scripts and existing workflows."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from emmai.cli import main  # noqa: E402
+
+main(["unikp-server"] + sys.argv[1:])
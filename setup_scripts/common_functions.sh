@@ -56,6 +56,9 @@ download_model_data() {
     log "Downloading model data to $unikp_root"
     mkdir -p "$unikp_root/prot_t5_xl_uniref50"
     python3 "${SCRIPT_DIR}/model_download.py" "$unikp_root"
+    # Array copy of the kcat regressor, which loads much faster than the pickle
+    python3 "${SCRIPT_DIR}/../python_scripts/tree_ensemble.py" convert "$unikp_root/UniKP for kcat.pkl" \
+        || log "Could not convert the kcat regressor; the pickle will be used instead"
 }
 
 # Common environment validation
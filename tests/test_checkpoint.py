@@ -0,0 +1,63 @@
+import os
+
+import pytest
+
+from emmai.checkpoint import (
+    append_journal,
+    compact_checkpoint,
+    journal_path_for,
+    read_checkpoint,
+)
+
+COLUMNS = ["Gene ID", "Mass"]
+
+
+class Killed(Exception):
+    """Stands in for the job being killed."""
+
+
+def kill_at(monkeypatch, name, suffix):
+    """Make ``os.<name>`` of a path ending in ``suffix`` kill the job."""
+    real = getattr(os, name)
+
+    def killing(path, *args):
+        if path.endswith(suffix):
+            raise Killed
+        return real(path, *args)
+
+    monkeypatch.setattr(os, name, killing)
+
+
+def genes(file_to_update):
+    return list(read_checkpoint(file_to_update, COLUMNS, repair=True)["Gene ID"])
+
+
+@pytest.mark.parametrize(
+    "name, suffix",
+    [
+        # Before the journal is set aside
+        ("replace", ".journal"),
+        # Before the new CSV replaces the old one
+        ("replace", ".tmp"),
+        # Before the set-aside journal is removed
+        ("remove", ".compacting"),
+    ],
+)
+def test_compaction_killed_at_each_step(tmp_path, monkeypatch, name, suffix):
+    file_to_update = str(tmp_path / "masses.csv")
+    journal_path = journal_path_for(file_to_update)
+    append_journal(journal_path, [{"Gene ID": "a", "Mass": 1.0}])
+    compact_checkpoint(file_to_update, COLUMNS)
+    append_journal(journal_path, [{"Gene ID": "b", "Mass": 2.0}])
+
+    with monkeypatch.context() as m:
+        kill_at(m, name, suffix)
+        with pytest.raises(Killed):
+            compact_checkpoint(file_to_update, COLUMNS)
+
+    # The rerun reads every row once, then carries on as usual
+    assert genes(file_to_update) == ["a", "b"]
+    append_journal(journal_path, [{"Gene ID": "c", "Mass": 3.0}])
+    compact_checkpoint(file_to_update, COLUMNS)
+    assert genes(file_to_update) == ["a", "b", "c"]
+    assert os.listdir(tmp_path) == ["masses.csv"]
@@ -0,0 +1,82 @@
+import cobra
+import requests
+
+from emmai.stages.data_retrieval import process_uniprot_chunk
+
+SPECIES = "Escherichia coli"
+STRAIN = "K-12"
+
+
+def uniprot_entry(accession, gene, sequence="MKV"):
+    """A UniProt JSON result for ``gene``, without a sequence if it is None."""
+    result = {"primaryAccession": accession, "genes": [{"geneName": {"value": gene}}]}
+    if sequence is not None:
+        result["sequence"] = {"value": sequence, "molWeight": 1000.0}
+    return result
+
+
+class StubResponse:
+    def __init__(self, results):
+        self.results = results
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"results": self.results}
+
+
+class StubSession:
+    """
+    Answers UniProt stream queries with the ``results`` of their level.
+
+    The level is ``"strain"`` or ``"species"``; queries of a level in
+    ``failing`` raise a connection error instead.
+    """
+
+    def __init__(self, results, failing=()):
+        self.results = results
+        self.failing = failing
+
+    def get(self, url, params, timeout):
+        level = "strain" if "strain:" in params["query"] else "species"
+        if level in self.failing:
+            raise requests.ConnectionError(f"{level} query failed")
+        return StubResponse(self.results.get(level, []))
+
+
+def resolve(session, *names):
+    genes = [cobra.Gene(f"g_{name}", name=name) for name in names]
+    results = process_uniprot_chunk(genes, set(), session, SPECIES, STRAIN, None)
+    return {row["Gene name"]: (row["Accession"], row["Organism"]) for row in results}
+
+
+def test_strain_entry_without_sequence_is_looked_up_for_the_species():
+    session = StubSession(
+        {
+            "strain": [uniprot_entry("P1", "thrL", None), uniprot_entry("P2", "thrA")],
+            "species": [uniprot_entry("Q1", "thrL")],
+        }
+    )
+    assert resolve(session, "thrL", "thrA") == {
+        "thrL": ("Q1", SPECIES),
+        "thrA": ("P2", STRAIN),
+    }
+
+
+def test_failed_strain_query_falls_back_to_the_species():
+    session = StubSession(
+        {"species": [uniprot_entry("Q1", "thrL"), uniprot_entry("Q2", "thrA")]},
+        failing=("strain",),
+    )
+    assert resolve(session, "thrL", "thrA") == {
+        "thrL": ("Q1", SPECIES),
+        "thrA": ("Q2", SPECIES),
+    }
+
+
+def test_failed_species_query_keeps_the_strain_matches():
+    session = StubSession(
+        {"strain": [uniprot_entry("P2", "thrA")]}, failing=("species",)
+    )
+    assert resolve(session, "thrL", "thrA") == {"thrA": ("P2", STRAIN)}
@@ -0,0 +1,205 @@
+import math
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from emmai import encoders  # noqa: E402
+from emmai.export_encoders import (  # noqa: E402
+    export_smiles_features,
+    export_t5_encoder,
+)
+
+TOLERANCE = 1e-4
+
+
+@pytest.fixture(scope="module")
+def model():
+    """A small randomly initialised T5 encoder, in place of ProtT5."""
+    torch.manual_seed(0)
+    config = transformers.T5Config(
+        vocab_size=32,
+        d_model=32,
+        d_kv=8,
+        d_ff=64,
+        num_layers=2,
+        num_heads=4,
+        relative_attention_num_buckets=8,
+        relative_attention_max_distance=16,
+    )
+    return transformers.T5EncoderModel(config).eval()
+
+
+def batch(widths):
+    """Token ids of one row per width, padded to the widest as by the tokenizer."""
+    width = max(widths)
+    input_ids = torch.zeros((len(widths), width), dtype=torch.long)
+    attention_mask = torch.zeros((len(widths), width), dtype=torch.long)
+    for row, length in enumerate(widths):
+        input_ids[row, :length] = torch.randint(3, 32, (length,))
+        attention_mask[row, :length] = 1
+    return input_ids, attention_mask
+
+
+def eager(model, input_ids, attention_mask):
+    with torch.no_grad():
+        return model(input_ids=input_ids, attention_mask=attention_mask)[0]
+
+
+def assert_close(expected, actual, attention_mask):
+    # Padded positions are never pooled, so only real tokens are compared
+    mask = attention_mask.bool()
+    assert torch.allclose(expected[mask], actual[mask], atol=TOLERANCE)
+
+
+@pytest.mark.parametrize("widths", [(7, 3), (12, 12, 5), (1,)])
+def test_export_wrapper_matches_eager(model, widths):
+    input_ids, attention_mask = batch(widths)
+    wrapper = encoders.T5EncoderForExport(model).eval()
+    with torch.no_grad():
+        actual = wrapper(input_ids, attention_mask)
+    assert_close(eager(model, input_ids, attention_mask), actual, attention_mask)
+
+
+def test_onnx_export_matches_eager_at_other_shapes(model, tmp_path):
+    pytest.importorskip("onnx")
+    pytest.importorskip("onnxruntime")
+    path = str(tmp_path / "encoder.onnx")
+    export_t5_encoder(model, *batch((6, 2)), path)
+    session = encoders.onnx_session(path)
+
+    # Exported at width 6 and batch 2, run at other widths and batch sizes
+    for widths in [(9, 4, 1), (3,), (20, 20)]:
+        input_ids, attention_mask = batch(widths)
+        (hidden,) = session.run(
+            None,
+            {
+                "input_ids": input_ids.numpy(),
+                "attention_mask": attention_mask.numpy(),
+            },
+        )
+        assert_close(
+            eager(model, input_ids, attention_mask),
+            torch.from_numpy(hidden),
+            attention_mask,
+        )
+
+
+def test_compiled_model_matches_eager(model):
+    # As ProtT5Encoder's compile backend, for dynamic shapes
+    compiled = torch.compile(model, dynamic=True)
+    for widths in [(9, 4), (5, 5, 2)]:
+        input_ids, attention_mask = batch(widths)
+        try:
+            actual = eager(compiled, input_ids, attention_mask)
+        except Exception as e:
+            pytest.skip(f"torch.compile is not available here: {e}")
+        assert_close(eager(model, input_ids, attention_mask), actual, attention_mask)
+
+
+class PositionalEncoding(torch.nn.Module):
+    """As in UniKP's pretrain_trfm, which indexes it by the second dimension."""
+
+    def __init__(self, d_model, dropout, max_len=5000):
+        super().__init__()
+        self.dropout = torch.nn.Dropout(p=dropout)
+        position = torch.arange(0.0, max_len).unsqueeze(1)
+        div_term = torch.exp(
+            torch.arange(0.0, d_model, 2) * -(math.log(10000.0) / d_model)
+        )
+        pe = torch.zeros(max_len, d_model)
+        pe[:, 0::2] = torch.sin(position * div_term)
+        pe[:, 1::2] = torch.cos(position * div_term)
+        self.register_buffer("pe", pe.unsqueeze(0))
+
+    def forward(self, x):
+        return self.dropout(x + self.pe[:, : x.size(1)])
+
+
+class TrfmSeq2seq(torch.nn.Module):
+    """Stand-in for UniKP's SMILES transformer, with its layers and encode()."""
+
+    def __init__(self, in_size, hidden_size, out_size, n_layers, dropout=0.1):
+        super().__init__()
+        self.embed = torch.nn.Embedding(in_size, hidden_size)
+        self.pe = PositionalEncoding(hidden_size, dropout)
+        self.trfm = torch.nn.Transformer(
+            d_model=hidden_size,
+            nhead=4,
+            num_encoder_layers=n_layers,
+            num_decoder_layers=n_layers,
+            dim_feedforward=hidden_size,
+        )
+        self.out = torch.nn.Linear(hidden_size, out_size)
+
+    def encode(self, src):
+        output = self.pe(self.embed(src))
+        for layer in self.trfm.encoder.layers[:-1]:
+            output = layer(output, None)
+        penultimate = output.detach().numpy()
+        output = self.trfm.encoder.layers[-1](output, None)
+        if self.trfm.encoder.norm:
+            output = self.trfm.encoder.norm(output)
+        output = output.detach().numpy()
+        return np.hstack(
+            [output.mean(axis=0), output.max(axis=0), output[0], penultimate[0]]
+        )
+
+
+@pytest.fixture(scope="module")
+def trfm():
+    """A randomly initialised SMILES transformer of UniKP's size."""
+    torch.manual_seed(0)
+    return TrfmSeq2seq(45, 256, 45, 4).eval()
+
+
+def smiles_batch(batch):
+    """Token ids of ``batch`` SMILES, padded to SMILES_SEQ_LEN as by get_array."""
+    src = torch.zeros((encoders.SMILES_SEQ_LEN, batch), dtype=torch.long)
+    for column in range(batch):
+        length = int(torch.randint(5, 60, ()))
+        src[:length, column] = torch.randint(1, 45, (length,))
+    return src
+
+
+@pytest.mark.parametrize("batch", [1, 3])
+def test_smiles_features_match_encode(trfm, batch):
+    src = smiles_batch(batch)
+    with torch.no_grad():
+        actual = encoders.SmilesFeatures(trfm).eval()(src).numpy()
+    assert np.allclose(trfm.encode(src), actual, atol=TOLERANCE)
+
+
+def test_smiles_onnx_export_matches_encode_at_other_batch_sizes(trfm, tmp_path):
+    pytest.importorskip("onnx")
+    pytest.importorskip("onnxruntime")
+    path = str(tmp_path / "smiles.onnx")
+    export_smiles_features(trfm, path)
+    session = encoders.onnx_session(path)
+
+    # Exported at batch 2
+    for batch in [1, 5]:
+        src = smiles_batch(batch)
+        (features,) = session.run(None, {"src": src.numpy()})
+        assert np.allclose(trfm.encode(src), features, atol=TOLERANCE)
+
+
+def test_compiled_smiles_encoder_matches_encode(trfm, tmp_path, monkeypatch):
+    # The UniKP vocabulary and weights are not needed by the compile backend
+    monkeypatch.setattr(
+        encoders,
+        "load_smiles_transformer",
+        lambda model_path: (None, trfm, torch.device("cpu")),
+    )
+    _, encode, _ = encoders.load_smiles_encoder(str(tmp_path), "compile")
+    for batch in [2, 4]:
+        src = smiles_batch(batch)
+        try:
+            # As smiles_to_vec calls it
+            with torch.no_grad():
+                actual = encode(src)
+        except Exception as e:
+            pytest.skip(f"torch.compile is not available here: {e}")
+        assert np.allclose(trfm.encode(src), actual, atol=TOLERANCE)
@@ -0,0 +1,135 @@
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+import requests
+
+from emmai.pubchem_cache import NOT_FOUND, PubChemCache
+from emmai.pubchem_resolver import PubChemResolver
+
+
+class StubPubChem(ThreadingHTTPServer):
+    """
+    PUG REST stand-in answering name lookups from ``responses``.
+
+    ``responses`` maps a name to the statuses to answer with in turn, the
+    last one repeating; a 200 returns ``SMILES_<name>``.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, responses, delay=0.0):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.responses = responses
+        self.delay = delay
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def next_status(self, name):
+        with self.lock:
+            self.requests.append(name)
+            statuses = self.responses.get(name, [404])
+            return statuses.pop(0) if len(statuses) > 1 else statuses[0]
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/rest/pug"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"])).decode()
+        name = parse_qs(body)["name"][0]
+        status = self.server.next_status(name)
+        time.sleep(self.server.delay)
+        payload = b""
+        if status == 200:
+            table = {"PropertyTable": {"Properties": [{"SMILES": f"SMILES_{name}"}]}}
+            payload = json.dumps(table).encode()
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(responses, delay=0.0):
+        server = StubPubChem(responses, delay)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def resolver_for(server, **kwargs):
+    kwargs = {"requests_per_second": 1000, "backoff": 0.01, **kwargs}
+    return PubChemResolver(base_url=server.base_url, **kwargs)
+
+
+def test_found_and_not_found(stub):
+    server = stub({"glucose": [200]})
+    resolver = resolver_for(server)
+
+    assert resolver.resolve("glucose") == "SMILES_glucose"
+    assert resolver.resolve("unobtainium") == NOT_FOUND
+
+
+def test_retries_transient_errors(stub):
+    server = stub({"glucose": [503, 429, 200], "pyruvate": [500]})
+    resolver = resolver_for(server, max_retries=2)
+
+    assert resolver.resolve("glucose") == "SMILES_glucose"
+    assert server.requests.count("glucose") == 3
+    with pytest.raises(requests.HTTPError):
+        resolver.resolve("pyruvate")
+    assert server.requests.count("pyruvate") == 3
+
+
+def test_concurrent_lookups_of_a_name_share_one_request(stub):
+    server = stub({"glucose": [200]}, delay=0.2)
+    resolver = resolver_for(server)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(resolver.resolve, ["glucose"] * 8))
+    assert results == ["SMILES_glucose"] * 8
+    assert server.requests == ["glucose"]
+
+
+def test_cache_answers_later_lookups(stub, tmp_path):
+    server = stub({"glucose": [200]})
+    cache = PubChemCache(str(tmp_path))
+    resolver_for(server, cache=cache).resolve("glucose")
+    resolver_for(server, cache=cache).resolve("unobtainium")
+
+    # A new resolver answers both, including the miss, from the cache
+    resolver = resolver_for(server, cache=cache)
+    assert resolver.resolve("glucose") == "SMILES_glucose"
+    assert resolver.resolve("unobtainium") == NOT_FOUND
+    assert server.requests == ["glucose", "unobtainium"]
+
+
+def test_connection_pool_holds_every_worker(stub, caplog):
+    server = stub({}, delay=0.05)
+    resolver = resolver_for(server, pool_size=16)
+
+    with caplog.at_level(logging.WARNING, logger="urllib3"):
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            list(executor.map(resolver.resolve, [f"name{i}" for i in range(64)]))
+    assert "Connection pool is full" not in caplog.text
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from emmai.config import Config
+from emmai.sharding import PAIR_COLUMNS, read_shards, shard_of, shard_path
+from emmai.stages import unikp
+
+
+def write_shards(shard_dir, pairs, count, kcat):
+    in_shard = np.array(shard_of(unikp.store_keys(pairs["Sequence"], "fp32"), count))
+    for index in range(count):
+        pairs[in_shard == index].assign(Kcat=kcat).to_csv(
+            shard_path(shard_dir, index, count), index=False, columns=PAIR_COLUMNS
+        )
+
+
+@pytest.fixture
+def config(tmp_path):
+    config = Config(
+        {"output_file_path": "out", "cache_dir": "cache", "transporters": []},
+        str(tmp_path),
+    )
+    pd.DataFrame(
+        {
+            "Reaction name": "reaction",
+            "Substrate Smiles": "CCO",
+            "Sequence": [f"MK{i}" for i in range(12)],
+            "Kcat": np.nan,
+        }
+    ).to_csv(f"{config.output_dir}/sequences_smiles.csv", index=False)
+    return config
+
+
+def test_rerun_with_another_worker_count(config, tmp_path, monkeypatch):
+    def run_workers(config, count, threads_per_worker):
+        # Each worker writes its shard; the kcat tells the runs apart
+        seqs_smiles = pd.read_csv(f"{config.output_dir}/sequences_smiles.csv")
+        write_shards(
+            shard_dir, seqs_smiles[["Substrate Smiles", "Sequence"]], count, count
+        )
+
+    shard_dir = tmp_path / "out" / "unikp_shards"
+    shard_dir.mkdir()
+    monkeypatch.setattr(unikp, "run_workers", run_workers)
+
+    def run(workers):
+        unikp.run(config, workers=workers)
+        complete = pd.read_csv(tmp_path / "out" / "sequences_smiles_complete.csv")
+        assert (complete["Kcat"] == workers).all()
+
+    run(3)
+    # Left by an interrupted run, and a copy someone kept
+    (shard_dir / "shard-1-of-3.csv.journal").write_text("")
+    (shard_dir / "shard-0-of-3.csv.bak").write_text("")
+    run(2)
+    assert sorted(path.name for path in shard_dir.iterdir()) == [
+        "shard-0-of-2.csv",
+        "shard-0-of-3.csv.bak",
+        "shard-1-of-2.csv",
+    ]
+
+
+def test_read_shards_picks_the_complete_count(tmp_path, capsys):
+    pairs = pd.DataFrame(
+        {"Substrate Smiles": "CCO", "Sequence": [f"MK{i}" for i in range(12)]}
+    )
+    write_shards(tmp_path, pairs, 2, 2.0)
+    # An interrupted earlier run with four shards
+    pairs.iloc[:1].assign(Kcat=4.0).to_csv(
+        shard_path(tmp_path, 0, 4), index=False, columns=PAIR_COLUMNS
+    )
+
+    assert (read_shards(tmp_path)["Kcat"] == 2.0).all()
+    assert "Ignoring shard results" in capsys.readouterr().out
+    with pytest.raises(FileNotFoundError):
+        read_shards(tmp_path, 4)
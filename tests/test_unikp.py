@@ -0,0 +1,106 @@
+import sys
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from emmai import tree_ensemble
+from emmai.config import Config
+from emmai.stages import unikp
+
+
+class FakeRegressor:
+    def __init__(self):
+        self.predicted = 0
+
+    def predict(self, vectors):
+        self.predicted += len(vectors)
+        return np.zeros(len(vectors))
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    model_path = tmp_path / "unikp"
+    model_path.mkdir()
+    (model_path / "UniKP for kcat.pkl").write_bytes(b"regressor")
+    monkeypatch.setenv("UNIKP", str(model_path))
+    monkeypatch.delenv("UNIKP_SERVER_SOCKET", raising=False)
+    return Config(
+        {"output_file_path": "out", "cache_dir": "cache", "unikp_chunk_size": 2},
+        str(tmp_path),
+    )
+
+
+@pytest.fixture
+def fake_models(monkeypatch):
+    """Stand-ins for the UniKP models that record how often ProtT5 loads."""
+    loads = []
+    regressor = FakeRegressor()
+    encoders = types.ModuleType("emmai.encoders")
+
+    def load_prot_t5(model_path, precision="fp32", backend="eager", **kwargs):
+        loads.append((precision, backend))
+        return object()
+
+    def Seq_to_vec(Sequence, model_path, token_budget=None, encoder=None, **kwargs):
+        # As the real function, which loads ProtT5 when not given an encoder
+        if encoder is None:
+            encoder = encoders.load_prot_t5(model_path)
+        return np.ones((len(Sequence), 1024), dtype=np.float32)
+
+    def smiles_to_vec(Smiles, model_path, batch_size=256, backend="eager"):
+        return np.ones((len(Smiles), 1024), dtype=np.float32)
+
+    encoders.load_prot_t5 = load_prot_t5
+    encoders.Seq_to_vec = Seq_to_vec
+    encoders.smiles_to_vec = smiles_to_vec
+    # The real encoders need torch and the UniKP code on $UNIKP
+    monkeypatch.setitem(sys.modules, "emmai.encoders", encoders)
+    monkeypatch.setattr(tree_ensemble, "load_kcat_regressor", lambda *args: regressor)
+    return loads, regressor
+
+
+def make_pairs(count):
+    return pd.DataFrame(
+        {
+            "Substrate Smiles": ["CCO"] * count,
+            "Sequence": [f"MK{i}" for i in range(count)],
+        }
+    )
+
+
+def test_prot_t5_loads_once_across_chunks(config, fake_models, tmp_path):
+    loads, _ = fake_models
+    predictor = unikp.KcatPredictor(config)
+    results = predictor.predict_in_chunks(make_pairs(10), str(tmp_path / "kcats.csv"))
+
+    assert len(results) == 10
+    assert loads == [("fp32", "eager")]
+
+
+def test_checkpoint_resumes_only_with_the_same_settings(config, fake_models, tmp_path):
+    _, regressor = fake_models
+    checkpoint = str(tmp_path / "kcats.csv")
+    unikp.KcatPredictor(config).predict_in_chunks(make_pairs(6), checkpoint)
+    assert regressor.predicted == 6
+
+    # A rerun with more pairs only predicts the new ones
+    unikp.KcatPredictor(config).predict_in_chunks(make_pairs(8), checkpoint)
+    assert regressor.predicted == 8
+
+    # Another precision starts the checkpoint over
+    config.data["unikp_precision"] = "bf16"
+    results = unikp.KcatPredictor(config).predict_in_chunks(make_pairs(8), checkpoint)
+    assert regressor.predicted == 16
+    assert len(results) == 8
+
+
+@pytest.mark.parametrize("value, threads", [("", None), ("4", 4), (None, None)])
+def test_predict_threads_from_omp_num_threads(config, monkeypatch, value, threads):
+    # Some SLURM setups export OMP_NUM_THREADS empty
+    if value is None:
+        monkeypatch.delenv("OMP_NUM_THREADS", raising=False)
+    else:
+        monkeypatch.setenv("OMP_NUM_THREADS", value)
+    assert unikp.KcatPredictor(config).predict_threads == threads